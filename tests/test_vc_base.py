@@ -0,0 +1,564 @@
+import ctypes
+import gc
+import queue
+import sys
+import threading
+import unittest
+from array import array
+
+from virtucamera.vc_base import VCBase, HAS_XFORM_KEYS, HAS_FLEN_KEYS
+
+MATRIX = tuple(float(i) for i in range(16))
+
+
+def noop(self, *args):
+    pass
+
+
+def make_handler_class(base=VCBase, **methods):
+    namespace = dict.fromkeys(VCBase._REQUIRED, noop)
+    namespace.update(methods)
+    return type("Handler", (base,), namespace)
+
+
+class RecordingHandler(make_handler_class()):
+
+    def __init__(self):
+        self.calls = []
+
+    def set_frame(self, vcserver, frame):
+        self.calls.append(("set_frame", frame))
+
+    def set_camera_transform(self, vcserver, camera_name, transform_matrix):
+        self.calls.append(("set_camera_transform", camera_name))
+
+    def set_camera_focal_length(self, vcserver, camera_name, focal_length):
+        self.calls.append(("set_camera_focal_length", camera_name, focal_length))
+
+    def set_camera_transform_keys(self, vcserver, camera_name, keyframes, transform_matrix_values):
+        self.calls.append(("set_camera_transform_keys", camera_name, keyframes))
+
+    def remove_camera_keys(self, vcserver, camera_name):
+        self.calls.append(("remove_camera_keys", camera_name))
+
+    def look_through_camera(self, vcserver, camera_name):
+        self.calls.append(("look_through_camera", camera_name))
+
+    def start_playback(self, vcserver, forward):
+        self.calls.append(("start_playback", forward))
+
+    def stop_playback(self, vcserver):
+        self.calls.append(("stop_playback",))
+
+    def capture_did_end(self, vcserver):
+        self.calls.append(("capture_did_end", vcserver))
+
+
+class TestSubclassDefinition(unittest.TestCase):
+
+    def test_missing_required_methods(self):
+        with self.assertRaises(TypeError) as context:
+            type("Handler", (VCBase,), {})
+        self.assertIn("get_playback_state", str(context.exception))
+
+    def test_abstract_subclass_skips_check(self):
+        class Abstract(VCBase, abstract=True):
+            pass
+
+        make_handler_class(Abstract)()
+
+    def test_overloads_are_called(self):
+        handler = RecordingHandler()
+        handler.set_camera_transform_keys(None, "cam", (1.0,), (MATRIX,))
+        self.assertEqual(handler.calls, [("set_camera_transform_keys", "cam", (1.0,))])
+
+    def test_slots_resolve_most_derived_method(self):
+        class Handler(RecordingHandler):
+            def get_playback_fps(self, vcserver):
+                return 24.0
+
+        self.assertEqual(Handler._slot_get_playback_fps(Handler(), None), 24.0)
+        self.assertIs(Handler._slot_set_frame, Handler.set_frame)
+        for name in VCBase._CALLBACKS:
+            self.assertTrue(hasattr(Handler, "_slot_" + name), name)
+
+
+
+class TestKeyBuffers(unittest.TestCase):
+
+    def test_transform_keys_buffer(self):
+        received = []
+
+        def set_camera_transform_keys(self, vcserver, camera_name, keyframes, transform_matrix_values):
+            received.append((camera_name, keyframes, transform_matrix_values))
+
+        handler = make_handler_class(set_camera_transform_keys=set_camera_transform_keys)()
+        handler.set_camera_transform_keys_buffer(
+            None, "cam", memoryview(array("f", [1.0, 2.0])), memoryview(array("f", range(32))))
+        self.assertEqual(received, [("cam", (1.0, 2.0), (
+            tuple(float(i) for i in range(16)), tuple(float(i) for i in range(16, 32))))])
+
+    def test_flen_keys_buffer(self):
+        received = []
+
+        def set_camera_flen_keys(self, vcserver, camera_name, keyframes, focal_length_values):
+            received.append((camera_name, keyframes, focal_length_values))
+
+        handler = make_handler_class(set_camera_flen_keys=set_camera_flen_keys)()
+        handler.set_camera_flen_keys_buffer(
+            None, "cam", memoryview(array("f", [1.0, 2.0])), memoryview(array("f", [35.0, 50.0])))
+        self.assertEqual(received, [("cam", (1.0, 2.0), (35.0, 50.0))])
+
+
+
+
+class TestTransformCache(unittest.TestCase):
+
+    def transform_calls(self, handler):
+        return [call for call in handler.calls if call[0] == "set_camera_transform"]
+
+    def test_repeated_values_are_skipped(self):
+        handler = RecordingHandler()
+        handler.set_camera_transform(None, "cam", MATRIX)
+        handler.set_camera_transform(None, "cam", memoryview(array("f", MATRIX)))
+        handler.set_camera_transform(None, "other", MATRIX)
+        handler.set_camera_focal_length(None, "cam", 35.0)
+        handler.set_camera_focal_length(None, "cam", 35.0)
+        handler.set_camera_focal_length(None, "cam", 50.0)
+        self.assertEqual(handler.calls, [
+            ("set_camera_transform", "cam"),
+            ("set_camera_transform", "other"),
+            ("set_camera_focal_length", "cam", 35.0),
+            ("set_camera_focal_length", "cam", 50.0),
+        ])
+
+    def test_opt_out(self):
+        class Handler(RecordingHandler):
+            _skip_transform_cache = True
+
+        handler = Handler()
+        handler.set_camera_transform(None, "cam", MATRIX)
+        handler.set_camera_transform(None, "cam", MATRIX)
+        self.assertEqual(len(handler.calls), 2)
+
+    def test_super_call_is_not_filtered_twice(self):
+        class Handler(RecordingHandler):
+            def set_camera_transform(self, vcserver, camera_name, transform_matrix):
+                self.calls.append(("subclass",))
+                super().set_camera_transform(vcserver, camera_name, transform_matrix)
+
+        handler = Handler()
+        handler.set_camera_transform(None, "cam", MATRIX)
+        handler.set_camera_transform(None, "cam", MATRIX)
+        self.assertEqual(handler.calls, [("subclass",), ("set_camera_transform", "cam")])
+
+    def test_invalidated_by_changes_outside_set_camera_transform(self):
+        changes = (
+            lambda handler: handler.invalidate_transform_cache("cam"),
+            lambda handler: handler.invalidate_camera_cache(),
+            lambda handler: handler.client_connected(None, "127.0.0.1", 1),
+            lambda handler: handler.client_disconnected(None),
+            lambda handler: handler.set_frame(None, 10.0),
+            lambda handler: handler.remove_camera_keys(None, "cam"),
+            lambda handler: handler.set_camera_transform_keys(None, "cam", (1.0,), (MATRIX,)),
+            lambda handler: handler.set_camera_transform_keys_buffer(
+                None, "cam", memoryview(array("f", [1.0])), memoryview(array("f", MATRIX))),
+        )
+        for change in changes:
+            handler = RecordingHandler()
+            handler.set_camera_transform(None, "cam", MATRIX)
+            change(handler)
+            handler.set_camera_transform(None, "cam", MATRIX)
+            self.assertEqual(len(self.transform_calls(handler)), 2)
+
+    def test_other_cameras_keep_their_cache(self):
+        handler = RecordingHandler()
+        handler.set_camera_transform(None, "cam", MATRIX)
+        handler.remove_camera_keys(None, "other")
+        handler.set_camera_transform(None, "cam", MATRIX)
+        self.assertEqual(len(self.transform_calls(handler)), 1)
+
+    def test_subclass_without_instance_dict(self):
+        with self.assertRaises(TypeError):
+            make_handler_class(__slots__=())
+        make_handler_class(__slots__=("__dict__",))().set_frame(None, 1.0)
+
+
+
+class TestSceneCameras(unittest.TestCase):
+
+    def test_scene_cameras_transforms(self):
+        def get_scene_cameras(self, vcserver):
+            return ["cam", "other"]
+
+        def get_camera_transform(self, vcserver, camera_name):
+            return MATRIX if camera_name == "cam" else tuple(range(16, 32))
+
+        handler = make_handler_class(
+            get_scene_cameras=get_scene_cameras, get_camera_transform=get_camera_transform)()
+        camera_names, matrices = handler.get_scene_cameras_transforms(None)
+        self.assertEqual(camera_names, ("cam", "other"))
+        self.assertEqual(memoryview(matrices).format, "f")
+        self.assertEqual(list(matrices), [float(i) for i in range(32)])
+
+    def test_scene_cameras_are_cached_until_invalidated(self):
+        scans = []
+        cameras = ["cam"]
+
+        def get_scene_cameras(self, vcserver):
+            scans.append(1)
+            return cameras
+
+        def create_new_camera(self, vcserver):
+            cameras.append("new")
+            return "new"
+
+        handler = make_handler_class(
+            get_scene_cameras=get_scene_cameras, create_new_camera=create_new_camera)()
+        self.assertTrue(handler.get_camera_exists(None, "cam"))
+        self.assertFalse(handler.get_camera_exists(None, "new"))
+        self.assertEqual(len(scans), 1)
+        handler.create_new_camera(None)
+        self.assertTrue(handler.get_camera_exists(None, "new"))
+        self.assertEqual(len(scans), 2)
+        cameras.remove("cam")
+        self.assertTrue(handler.get_camera_exists(None, "cam"))
+        handler.invalidate_camera_cache()
+        self.assertFalse(handler.get_camera_exists(None, "cam"))
+        self.assertEqual(len(scans), 3)
+
+
+
+class DeferredHandler(RecordingHandler):
+
+    def __init__(self):
+        super().__init__()
+        self.deferred = queue.Queue()
+
+    def call_deferred(self, vcserver, function):
+        self.deferred.put(function)
+        return True
+
+
+class TestFrameCoalescing(unittest.TestCase):
+
+    def test_without_call_deferred_every_frame_is_set(self):
+        handler = RecordingHandler()
+        handler.set_frame(None, 1.0)
+        handler.set_frame(None, 2.0)
+        self.assertEqual(handler.calls, [("set_frame", 1.0), ("set_frame", 2.0)])
+
+    def test_only_last_frame_is_set(self):
+        handler = DeferredHandler()
+        for frame in (1.0, 2.0, 3.0):
+            handler.set_frame(None, frame)
+        self.assertEqual(handler.deferred.qsize(), 1)
+        handler.deferred.get()()
+        handler.set_frame(None, 4.0)
+        handler.deferred.get()()
+        self.assertEqual(handler.calls, [("set_frame", 3.0), ("set_frame", 4.0)])
+
+    def test_opt_out(self):
+        class Handler(DeferredHandler):
+            _skip_frame_coalescing = True
+
+        handler = Handler()
+        handler.set_frame(None, 1.0)
+        handler.set_frame(None, 2.0)
+        self.assertTrue(handler.deferred.empty())
+        self.assertEqual(len(handler.calls), 2)
+
+    def test_call_deferred_error_releases_latch(self):
+        class Handler(RecordingHandler):
+            fail = True
+
+            def call_deferred(self, vcserver, function):
+                if self.fail:
+                    raise RuntimeError
+                return False
+
+        handler = Handler()
+        with self.assertRaises(RuntimeError):
+            handler.set_frame(None, 1.0)
+        handler.fail = False
+        handler.set_frame(None, 2.0)
+        self.assertEqual(handler.calls, [("set_frame", 2.0)])
+
+    def test_last_frame_is_set_with_concurrent_flushes(self):
+        handler = DeferredHandler()
+        done = threading.Event()
+
+        def main_loop():
+            while not (done.is_set() and handler.deferred.empty()):
+                try:
+                    handler.deferred.get(timeout=0.01)()
+                except queue.Empty:
+                    pass
+
+        # Switch threads as often as possible to hit the window between
+        # reading and setting the pending frame
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            thread = threading.Thread(target=main_loop)
+            thread.start()
+            for frame in range(100000):
+                handler.set_frame(None, float(frame))
+            done.set()
+            thread.join()
+        finally:
+            sys.setswitchinterval(switch_interval)
+        self.assertEqual(handler.calls[-1], ("set_frame", 99999.0))
+        self.assertIsNone(handler._pending_frame)
+
+
+
+class TestStateGuards(unittest.TestCase):
+
+    def test_repeated_states_are_skipped(self):
+        handler = RecordingHandler()
+        handler.look_through_camera(None, "cam")
+        handler.look_through_camera(None, "cam")
+        handler.start_playback(None, True)
+        handler.start_playback(None, True)
+        handler.start_playback(None, False)
+        handler.stop_playback(None)
+        handler.stop_playback(None)
+        self.assertEqual(handler.calls, [
+            ("look_through_camera", "cam"),
+            ("start_playback", True),
+            ("start_playback", False),
+            ("stop_playback",),
+        ])
+
+    def test_first_stop_is_not_skipped(self):
+        handler = RecordingHandler()
+        handler.stop_playback(None)
+        self.assertEqual(handler.calls, [("stop_playback",)])
+
+    def test_state_is_forgotten(self):
+        class Handler(RecordingHandler):
+            def client_connected(self, vcserver, client_ip, client_port):
+                pass
+
+        resets = (
+            lambda handler: handler.invalidate_view_state(),
+            lambda handler: handler.invalidate_camera_cache(),
+            lambda handler: handler.client_connected(None, "127.0.0.1", 1),
+            lambda handler: handler.client_disconnected(None),
+        )
+        for handler_class in (RecordingHandler, Handler):
+            for reset in resets:
+                handler = handler_class()
+                handler.look_through_camera(None, "cam")
+                reset(handler)
+                handler.look_through_camera(None, "cam")
+                self.assertEqual(len(handler.calls), 2)
+
+
+
+class TestCaptureBuffer(unittest.TestCase):
+
+    def test_buffer_is_reused_and_only_grows(self):
+        handler = RecordingHandler()
+        pointer, size = handler._get_or_grow_capture_buffer(4, 2)
+        self.assertEqual(size, 32)
+        self.assertEqual(handler._get_or_grow_capture_buffer(2, 4), (pointer, 32))
+        self.assertEqual(handler._get_or_grow_capture_buffer(2, 2), (pointer, 16))
+        self.assertEqual(ctypes.sizeof(handler._capture_buffer), 32)
+
+        pointer, size = handler._get_or_grow_capture_buffer(8, 8)
+        self.assertEqual(size, 256)
+        self.assertEqual(ctypes.sizeof(handler._capture_buffer), 256)
+        ctypes.memset(pointer, 0xff, size)
+        self.assertEqual(handler._get_or_grow_capture_buffer(4, 4, 3), (pointer, 48))
+        self.assertEqual(ctypes.sizeof(handler._capture_buffer), 256)
+
+    def test_buffers_are_not_shared(self):
+        handlers = (RecordingHandler(), RecordingHandler())
+        pointers = {handler._get_or_grow_capture_buffer(4, 4)[0] for handler in handlers}
+        self.assertEqual(len(pointers), 2)
+
+
+
+class TestPlaybackAndKeysState(unittest.TestCase):
+
+    def test_has_keys_bitmask(self):
+        def get_camera_has_keys(self, vcserver, camera_name):
+            if camera_name == "flags":
+                return HAS_FLEN_KEYS
+            return (True, camera_name == "both")
+
+        handler = make_handler_class(get_camera_has_keys=get_camera_has_keys)()
+        self.assertEqual(handler.get_camera_has_keys(None, "cam"), HAS_XFORM_KEYS)
+        self.assertEqual(
+            handler.get_camera_has_keys(None, "both"), HAS_XFORM_KEYS | HAS_FLEN_KEYS)
+        self.assertEqual(handler.get_camera_has_keys(None, "flags"), HAS_FLEN_KEYS)
+
+    def test_playback_state_into(self):
+        def get_playback_state(self, vcserver):
+            return (5.0, 1.0, 100.0)
+
+        handler = make_handler_class(get_playback_state=get_playback_state)()
+        out = memoryview(array("f", [0.0] * 3))
+        handler.get_playback_state_into(None, out)
+        self.assertEqual(out.tolist(), [5.0, 1.0, 100.0])
+
+
+
+class TestCaptureEnd(unittest.TestCase):
+
+    def test_unfinished_capture_is_ended_on_destruction(self):
+        calls = []
+        handler = RecordingHandler()
+        handler.calls = calls
+        handler.capture_will_start(None)
+        del handler
+        gc.collect()
+        self.assertEqual(calls, [("capture_did_end", None)])
+
+    def test_finished_capture_is_not_ended_again(self):
+        calls = []
+        handler = RecordingHandler()
+        handler.calls = calls
+        handler.capture_will_start(None)
+        handler.capture_did_end("server")
+        del handler
+        gc.collect()
+        self.assertEqual(calls, [("capture_did_end", "server")])
+
+    def test_failed_capture_start_is_not_ended(self):
+        class Handler(RecordingHandler):
+            def capture_will_start(self, vcserver):
+                raise MemoryError
+
+        calls = []
+        handler = Handler()
+        handler.calls = calls
+        with self.assertRaises(MemoryError):
+            handler.capture_will_start(None)
+        del handler
+        gc.collect()
+        self.assertEqual(calls, [])
+
+
+
+class TestKeyChunks(unittest.TestCase):
+
+    def chunk(self, handler, camera_name, index, count, frame):
+        handler.set_camera_transform_keys_chunk(
+            None, camera_name, index, count,
+            memoryview(array("f", [frame])), memoryview(array("f", MATRIX)))
+
+    def test_chunks_are_set_at_once(self):
+        handler = RecordingHandler()
+        for index in range(3):
+            self.chunk(handler, "cam", index, 3, float(index))
+        self.assertEqual(handler.calls, [("set_camera_transform_keys", "cam", (0.0, 1.0, 2.0))])
+
+    def test_out_of_order_chunk(self):
+        handler = RecordingHandler()
+        with self.assertRaises(ValueError):
+            self.chunk(handler, "cam", 1, 3, 1.0)
+        self.chunk(handler, "cam", 0, 3, 0.0)
+        with self.assertRaises(ValueError):
+            self.chunk(handler, "cam", 2, 3, 2.0)
+        self.assertEqual(handler._key_accum, {})
+
+    def test_chunk_count_mismatch(self):
+        handler = RecordingHandler()
+        self.chunk(handler, "cam", 0, 3, 0.0)
+        with self.assertRaises(ValueError):
+            self.chunk(handler, "cam", 1, 2, 1.0)
+        self.assertEqual(handler._key_accum, {})
+        self.assertEqual(handler.calls, [])
+
+    def test_chunk_out_of_range(self):
+        handler = RecordingHandler()
+        for index, count in ((0, 0), (0, -1), (1, 1), (-1, 3)):
+            self.chunk(handler, "cam", 0, 3, 0.0)
+            with self.assertRaises(ValueError):
+                self.chunk(handler, "cam", index, count, 1.0)
+            self.assertEqual(handler._key_accum, {})
+        self.assertEqual(handler.calls, [])
+
+    def test_unfinished_chunks_are_dropped(self):
+        handler = RecordingHandler()
+        self.chunk(handler, "cam", 0, 3, 0.0)
+        handler.client_disconnected(None)
+        self.assertEqual(handler._key_accum, {})
+        self.chunk(handler, "cam", 0, 2, 0.0)
+        self.chunk(handler, "cam", 0, 2, 5.0)
+        self.chunk(handler, "cam", 1, 2, 6.0)
+        self.assertEqual(handler.calls, [("set_camera_transform_keys", "cam", (5.0, 6.0))])
+
+
+
+class TestCameraIds(unittest.TestCase):
+
+    def make_handler(self, cameras, resolved):
+        def get_scene_cameras(self, vcserver):
+            return list(cameras)
+
+        def resolve_camera_handle(self, vcserver, camera_name):
+            resolved.append(camera_name)
+            return ("handle", camera_name)
+
+        return make_handler_class(
+            get_scene_cameras=get_scene_cameras, resolve_camera_handle=resolve_camera_handle)()
+
+    def test_ids_and_names(self):
+        handler = self.make_handler(["cam", "other"], [])
+        cam_id = handler.get_camera_id("cam")
+        other_id = handler.get_camera_id("other")
+        self.assertNotEqual(cam_id, other_id)
+        self.assertEqual(handler.get_camera_id("cam"), cam_id)
+        self.assertEqual(handler.get_camera_name(other_id), "other")
+        self.assertEqual(
+            handler.get_scene_camera_ids(None), [(cam_id, "cam"), (other_id, "other")])
+
+    def test_handles_are_cached_until_invalidated(self):
+        resolved = []
+        handler = self.make_handler(["cam"], resolved)
+        cam_id = handler.get_camera_id("cam")
+        self.assertEqual(handler.get_camera_handle(None, cam_id), ("handle", "cam"))
+        self.assertEqual(handler.get_camera_handle(None, cam_id), ("handle", "cam"))
+        self.assertEqual(resolved, ["cam"])
+        handler.invalidate_camera_cache()
+        self.assertEqual(handler.get_camera_handle(None, cam_id), ("handle", "cam"))
+        self.assertEqual(resolved, ["cam", "cam"])
+
+    def test_renamed_camera(self):
+        cameras = ["cam"]
+        resolved = []
+        handler = self.make_handler(cameras, resolved)
+        cam_id = handler.get_camera_id("cam")
+        handler.get_camera_handle(None, cam_id)
+
+        cameras[0] = "renamed"
+        handler.invalidate_camera_cache()
+        with self.assertRaises(KeyError):
+            handler.get_camera_handle(None, cam_id)
+        with self.assertRaises(KeyError):
+            handler.get_camera_name(cam_id)
+        renamed_id = handler.get_camera_id("renamed")
+        self.assertNotEqual(renamed_id, cam_id)
+        self.assertEqual(handler.get_camera_handle(None, renamed_id), ("handle", "renamed"))
+        self.assertEqual(resolved, ["cam", "renamed"])
+
+    def test_ids_are_pruned_and_never_reused(self):
+        cameras = []
+        handler = self.make_handler(cameras, [])
+        ids = set()
+        for index in range(10):
+            cameras[:] = ["cam{}".format(index)]
+            handler.invalidate_camera_cache()
+            (camera_id, _), = handler.get_scene_camera_ids(None)
+            ids.add(camera_id)
+        self.assertEqual(len(ids), 10)
+        self.assertEqual(handler._name_to_id, {"cam9": camera_id})
+        self.assertEqual(handler._id_to_name, {camera_id: "cam9"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,242 @@
+import asyncio
+import gc
+import inspect
+import unittest
+import warnings
+from array import array
+
+from virtucamera.vc_base import VCBase, HAS_FLEN_KEYS
+from virtucamera.vc_base_async import VCBaseAsync
+
+MATRIX = tuple(float(i) for i in range(16))
+
+
+def noop(self, *args):
+    pass
+
+
+def make_handler(**methods):
+    namespace = dict.fromkeys(VCBase._REQUIRED, noop)
+    namespace.update(methods)
+    return type("Handler", (VCBaseAsync,), namespace)()
+
+
+class TestAsync(unittest.TestCase):
+
+    def test_coroutines_are_detected(self):
+        async def get_camera_transform(self, vcserver, camera_name):
+            return await self.run_in_dcc(lambda: MATRIX)
+
+        handler = make_handler(get_camera_transform=get_camera_transform)
+        # The default get_scene_cameras_transforms() calls get_camera_transform()
+        self.assertEqual(
+            type(handler)._async_callbacks,
+            {"get_camera_transform", "get_scene_cameras_transforms"})
+        self.assertEqual(asyncio.run(handler.get_camera_transform(None, "cam")), MATRIX)
+
+    def test_async_capture_tracking(self):
+        ended = []
+
+        async def capture_will_start(self, vcserver):
+            pass
+
+        async def capture_did_end(self, vcserver):
+            ended.append(vcserver)
+
+        handler = make_handler(
+            capture_will_start=capture_will_start, capture_did_end=capture_did_end)
+        asyncio.run(handler.capture_will_start(None))
+        self.assertTrue(handler._capture_started)
+        asyncio.run(handler.capture_did_end("server"))
+        self.assertFalse(handler._capture_started)
+
+        # Can't be awaited on destruction, so it must not be called
+        asyncio.run(handler.capture_will_start(None))
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            del handler
+            gc.collect()
+        self.assertEqual(ended, ["server"])
+
+    def test_async_create_new_camera_invalidates_cache(self):
+        async def create_new_camera(self, vcserver):
+            return "new"
+
+        handler = make_handler(create_new_camera=create_new_camera)
+        asyncio.run(handler.create_new_camera(None))
+        self.assertEqual(handler.scene_version, 1)
+
+    def test_async_keyframes_invalidate_transform_cache(self):
+        transforms = []
+
+        def set_camera_transform(self, vcserver, camera_name, transform_matrix):
+            transforms.append(camera_name)
+
+        async def remove_camera_keys(self, vcserver, camera_name):
+            pass
+
+        handler = make_handler(
+            set_camera_transform=set_camera_transform, remove_camera_keys=remove_camera_keys)
+        handler.set_camera_transform(None, "cam", MATRIX)
+        asyncio.run(handler.remove_camera_keys(None, "cam"))
+        handler.set_camera_transform(None, "cam", MATRIX)
+        self.assertEqual(transforms, ["cam", "cam"])
+
+    def test_async_set_frame_invalidates_transform_cache(self):
+        transforms = []
+        frames = []
+
+        def set_camera_transform(self, vcserver, camera_name, transform_matrix):
+            transforms.append(camera_name)
+
+        async def set_frame(self, vcserver, frame):
+            # The cache must still be valid until the frame is set
+            self.set_camera_transform(vcserver, "cam", MATRIX)
+            await asyncio.sleep(0)
+            frames.append(frame)
+
+        def call_deferred(self, vcserver, function):
+            raise AssertionError("Coroutines must not be deferred")
+
+        handler = make_handler(
+            set_camera_transform=set_camera_transform, set_frame=set_frame,
+            call_deferred=call_deferred)
+        handler.set_camera_transform(None, "cam", MATRIX)
+        asyncio.run(handler.set_frame(None, 1.0))
+        asyncio.run(handler.set_frame(None, 2.0))
+        handler.set_camera_transform(None, "cam", MATRIX)
+        self.assertEqual(frames, [1.0, 2.0])
+        self.assertEqual(transforms, ["cam", "cam", "cam"])
+
+    def test_async_has_keys_bitmask(self):
+        async def get_camera_has_keys(self, vcserver, camera_name):
+            return (False, True)
+
+        handler = make_handler(get_camera_has_keys=get_camera_has_keys)
+        self.assertEqual(asyncio.run(handler.get_camera_has_keys(None, "cam")), HAS_FLEN_KEYS)
+
+    def test_async_repeated_states_are_skipped(self):
+        calls = []
+
+        async def look_through_camera(self, vcserver, camera_name):
+            calls.append(camera_name)
+
+        async def set_camera_focal_length(self, vcserver, camera_name, focal_length):
+            calls.append(focal_length)
+
+        handler = make_handler(
+            look_through_camera=look_through_camera,
+            set_camera_focal_length=set_camera_focal_length)
+        for _ in range(2):
+            asyncio.run(handler.look_through_camera(None, "cam"))
+            asyncio.run(handler.set_camera_focal_length(None, "cam", 35.0))
+        self.assertEqual(calls, ["cam", 35.0])
+
+
+
+class TestAsyncDefaults(unittest.TestCase):
+
+    DEFAULTS = (
+        "get_playback_state_into",
+        "get_camera_exists",
+        "get_scene_camera_ids",
+        "get_scene_cameras_transforms",
+        "set_camera_flen_keys_buffer",
+        "set_camera_transform_keys_buffer",
+        "set_camera_transform_keys_chunk",
+        "get_camera_handle",
+    )
+
+    def test_sync_dependencies_keep_sync_defaults(self):
+        handler_class = type(make_handler())
+        for name in self.DEFAULTS:
+            self.assertIs(getattr(handler_class, name), getattr(VCBase, name), name)
+        self.assertEqual(handler_class._async_callbacks, frozenset())
+
+    def make_async_handler(self, received):
+        async def get_playback_state(self, vcserver):
+            return (5.0, 1.0, 100.0)
+
+        async def get_scene_cameras(self, vcserver):
+            return ["cam", "other"]
+
+        def get_camera_transform(self, vcserver, camera_name):
+            return MATRIX
+
+        async def resolve_camera_handle(self, vcserver, camera_name):
+            return ("handle", camera_name)
+
+        async def set_camera_flen_keys(self, vcserver, camera_name, keyframes, focal_length_values):
+            received.append((camera_name, keyframes, focal_length_values))
+
+        async def set_camera_transform_keys(self, vcserver, camera_name, keyframes, transform_matrix_values):
+            received.append((camera_name, keyframes, transform_matrix_values))
+
+        return make_handler(
+            get_playback_state=get_playback_state, get_scene_cameras=get_scene_cameras,
+            get_camera_transform=get_camera_transform,
+            resolve_camera_handle=resolve_camera_handle,
+            set_camera_flen_keys=set_camera_flen_keys,
+            set_camera_transform_keys=set_camera_transform_keys)
+
+    def test_async_dependencies_make_async_defaults(self):
+        received = []
+        handler = self.make_async_handler(received)
+        handler_class = type(handler)
+        for name in self.DEFAULTS:
+            self.assertTrue(inspect.iscoroutinefunction(getattr(handler_class, name)), name)
+            if name in VCBase._CALLBACKS:
+                self.assertIn(name, handler_class._async_callbacks)
+                self.assertIs(getattr(handler_class, "_slot_" + name), getattr(handler_class, name))
+
+        out = memoryview(array("f", [0.0] * 3))
+        asyncio.run(handler.get_playback_state_into(None, out))
+        self.assertEqual(out.tolist(), [5.0, 1.0, 100.0])
+        self.assertTrue(asyncio.run(handler.get_camera_exists(None, "cam")))
+        self.assertFalse(asyncio.run(handler.get_camera_exists(None, "missing")))
+        camera_ids = asyncio.run(handler.get_scene_camera_ids(None))
+        self.assertEqual([camera_name for _, camera_name in camera_ids], ["cam", "other"])
+        self.assertEqual(
+            asyncio.run(handler.get_camera_handle(None, camera_ids[0][0])), ("handle", "cam"))
+        camera_names, matrices = asyncio.run(handler.get_scene_cameras_transforms(None))
+        self.assertEqual(camera_names, ("cam", "other"))
+        self.assertEqual(list(matrices), list(MATRIX) * 2)
+
+        asyncio.run(handler.set_camera_flen_keys_buffer(
+            None, "cam", memoryview(array("f", [1.0])), memoryview(array("f", [35.0]))))
+        for index in range(2):
+            asyncio.run(handler.set_camera_transform_keys_chunk(
+                None, "cam", index, 2,
+                memoryview(array("f", [float(index)])), memoryview(array("f", MATRIX))))
+        self.assertEqual(received, [
+            ("cam", (1.0,), (35.0,)),
+            ("cam", (0.0, 1.0), (MATRIX, MATRIX)),
+        ])
+
+    def test_overloaded_defaults_are_kept(self):
+        async def get_scene_cameras(self, vcserver):
+            return ["cam"]
+
+        def get_camera_exists(self, vcserver, camera_name):
+            return True
+
+        handler_class = type(make_handler(
+            get_scene_cameras=get_scene_cameras, get_camera_exists=get_camera_exists))
+        self.assertIs(handler_class.get_camera_exists, get_camera_exists)
+        self.assertTrue(inspect.iscoroutinefunction(handler_class.get_scene_camera_ids))
+
+    def test_defaults_follow_subclass_overloads(self):
+        handler_class = type(self.make_async_handler([]))
+
+        class Handler(handler_class):
+            def get_scene_cameras(self, vcserver):
+                return ["cam"]
+
+        self.assertIs(Handler.get_camera_exists, VCBase.get_camera_exists)
+        self.assertIs(Handler._slot_get_camera_exists, VCBase.get_camera_exists)
+        self.assertTrue(Handler().get_camera_exists(None, "cam"))
+        self.assertTrue(inspect.iscoroutinefunction(Handler.get_camera_handle))
+
+
+if __name__ == "__main__":
+    unittest.main()
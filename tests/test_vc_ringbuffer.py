@@ -0,0 +1,127 @@
+import ctypes
+import threading
+import time
+import unittest
+
+from virtucamera.vc_ringbuffer import VCRingBuffer
+
+
+def write_frame(ringbuffer, value, timeout=None):
+    slot = ringbuffer.begin_write(timeout)
+    if slot is None:
+        return None
+    ringbuffer.view(slot)[0] = value
+    ringbuffer.end_write(slot)
+    return slot
+
+
+def read_frame(ringbuffer, timeout=None):
+    slot = ringbuffer.begin_read(timeout)
+    if slot is None:
+        return None
+    value = ringbuffer.view(slot)[0]
+    ringbuffer.end_read(slot)
+    return value
+
+
+class TestVCRingBuffer(unittest.TestCase):
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            VCRingBuffer(1, 16)
+        with self.assertRaises(ValueError):
+            VCRingBuffer(2, 0)
+
+    def test_slots_share_one_contiguous_block(self):
+        ringbuffer = VCRingBuffer(3, 16)
+        for slot in range(3):
+            self.assertEqual(len(ringbuffer.view(slot)), 16)
+            self.assertEqual(ringbuffer.pointer(slot), ringbuffer.pointer(0) + slot * 16)
+            ringbuffer.view(slot)[5] = slot + 1
+            self.assertEqual(
+                ctypes.c_ubyte.from_address(ringbuffer.pointer(slot) + 5).value, slot + 1)
+
+    def test_frames_are_read_in_order(self):
+        ringbuffer = VCRingBuffer(3, 4)
+        for value in (1, 2, 3):
+            write_frame(ringbuffer, value)
+        self.assertEqual([read_frame(ringbuffer, 0) for _ in range(3)], [1, 2, 3])
+
+    def test_low_latency_drops_oldest_frame(self):
+        ringbuffer = VCRingBuffer(3, 4, low_latency=True)
+        for value in (1, 2, 3, 4, 5):
+            self.assertIsNotNone(write_frame(ringbuffer, value, timeout=0))
+        self.assertEqual(ringbuffer.dropped_frames, 2)
+        self.assertEqual([read_frame(ringbuffer, 0) for _ in range(3)], [3, 4, 5])
+        self.assertIsNone(read_frame(ringbuffer, 0))
+
+    def test_low_latency_never_reuses_slot_being_read(self):
+        ringbuffer = VCRingBuffer(2, 4, low_latency=True)
+        write_frame(ringbuffer, 1)
+        reading = ringbuffer.begin_read(0)
+        for value in (2, 3, 4):
+            self.assertNotEqual(write_frame(ringbuffer, value, timeout=0), reading)
+        self.assertEqual(ringbuffer.view(reading)[0], 1)
+        ringbuffer.end_read(reading)
+        self.assertEqual(read_frame(ringbuffer, 0), 4)
+
+    def test_blocking_mode_times_out_when_full(self):
+        ringbuffer = VCRingBuffer(2, 4, low_latency=False)
+        write_frame(ringbuffer, 1)
+        write_frame(ringbuffer, 2)
+        start = time.monotonic()
+        self.assertIsNone(ringbuffer.begin_write(0.05))
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+        self.assertEqual(ringbuffer.dropped_frames, 0)
+        self.assertEqual([read_frame(ringbuffer, 0) for _ in range(2)], [1, 2])
+
+    def test_blocking_mode_waits_for_a_free_slot(self):
+        ringbuffer = VCRingBuffer(2, 4, low_latency=False)
+        write_frame(ringbuffer, 1)
+        write_frame(ringbuffer, 2)
+        timer = threading.Timer(0.05, read_frame, (ringbuffer,))
+        timer.start()
+        self.assertIsNotNone(write_frame(ringbuffer, 3, timeout=5))
+        timer.join()
+        self.assertEqual([read_frame(ringbuffer, 0) for _ in range(2)], [2, 3])
+
+    def test_read_times_out_when_empty(self):
+        ringbuffer = VCRingBuffer(2, 4)
+        self.assertIsNone(ringbuffer.begin_read(0.01))
+
+    def test_clear_drops_waiting_frames_only(self):
+        ringbuffer = VCRingBuffer(3, 4, low_latency=False)
+        write_frame(ringbuffer, 1)
+        reading = ringbuffer.begin_read(0)
+        write_frame(ringbuffer, 2)
+        write_frame(ringbuffer, 3)
+        ringbuffer.clear()
+        self.assertIsNone(ringbuffer.begin_read(0))
+        self.assertEqual(ringbuffer.view(reading)[0], 1)
+        ringbuffer.end_read(reading)
+        for value in (4, 5, 6):
+            self.assertIsNotNone(write_frame(ringbuffer, value, timeout=0))
+
+    def test_threaded_producer_and_consumer(self):
+        ringbuffer = VCRingBuffer(3, 4, low_latency=True)
+        received = []
+
+        def consume():
+            while True:
+                value = read_frame(ringbuffer, timeout=0.5)
+                if value is None:
+                    return
+                received.append(value)
+
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+        for value in range(200):
+            write_frame(ringbuffer, value)
+        consumer.join()
+        self.assertEqual(received, sorted(received))
+        self.assertEqual(received[-1], 199)
+        self.assertEqual(len(received) + ringbuffer.dropped_frames, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
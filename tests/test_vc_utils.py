@@ -0,0 +1,65 @@
+import ctypes
+import unittest
+
+from virtucamera import vc_utils
+
+MATRIX = tuple(float(i) for i in range(16))
+
+
+class TestMatrices(unittest.TestCase):
+
+    def test_transpose(self):
+        transposed = vc_utils.transpose_matrix(MATRIX)
+        self.assertEqual(transposed[:4], (0.0, 4.0, 8.0, 12.0))
+        self.assertEqual(transposed[12:], (3.0, 7.0, 11.0, 15.0))
+        self.assertEqual(vc_utils.transpose_matrix(transposed), MATRIX)
+
+    def test_zup_to_yup(self):
+        # Z+ up translation (1, 2, 3) is (1, 3, -2) with Y+ up
+        translation = (1.0, 0.0, 0.0, 0.0,
+                       0.0, 1.0, 0.0, 0.0,
+                       0.0, 0.0, 1.0, 0.0,
+                       1.0, 2.0, 3.0, 1.0)
+        self.assertEqual(vc_utils.zup_to_yup_matrix(translation)[12:], (1.0, 3.0, -2.0, 1.0))
+
+    def test_up_axis_round_trip(self):
+        yup = vc_utils.zup_to_yup_matrix(MATRIX)
+        self.assertNotEqual(yup, MATRIX)
+        self.assertEqual(vc_utils.yup_to_zup_matrix(yup), MATRIX)
+        self.assertEqual(vc_utils.zup_to_yup_matrix(vc_utils.yup_to_zup_matrix(MATRIX)), MATRIX)
+
+
+
+class TestFlipVertical(unittest.TestCase):
+
+    ROWS = b"aaa" b"bbb" b"ccc"
+    FLIPPED = b"ccc" b"bbb" b"aaa"
+
+    def test_copy(self):
+        src = ctypes.create_string_buffer(self.ROWS, len(self.ROWS))
+        dst = ctypes.create_string_buffer(len(self.ROWS))
+        vc_utils.flip_vertical(ctypes.addressof(src), ctypes.addressof(dst), 3, 3)
+        self.assertEqual(dst.raw, self.FLIPPED)
+        self.assertEqual(src.raw, self.ROWS)
+
+    def test_in_place(self):
+        # Odd and even number of rows
+        for rows, flipped, stride in ((self.ROWS, self.FLIPPED, 3), (b"aabb", b"bbaa", 2)):
+            image = ctypes.create_string_buffer(rows, len(rows))
+            address = ctypes.addressof(image)
+            vc_utils.flip_vertical(address, address, stride, len(rows) // stride)
+            self.assertEqual(image.raw, flipped)
+
+    def test_overlapping_images(self):
+        memory = ctypes.create_string_buffer(self.ROWS * 2, len(self.ROWS) * 2)
+        address = ctypes.addressof(memory)
+        for src_ptr, dst_ptr in ((address, address + 3), (address + 8, address)):
+            with self.assertRaises(ValueError):
+                vc_utils.flip_vertical(src_ptr, dst_ptr, 3, 3)
+        self.assertEqual(memory.raw, self.ROWS * 2)
+        vc_utils.flip_vertical(address, address + 9, 3, 3)
+        self.assertEqual(memory.raw, self.ROWS + self.FLIPPED)
+
+
+if __name__ == "__main__":
+    unittest.main()
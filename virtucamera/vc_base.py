@@ -20,13 +20,257 @@
 # NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THE SOFTWARE,
 # EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-from abc import ABCMeta, abstractmethod
+import ctypes
+import functools
+import inspect
+import threading
+from array import array
+
+__all__ = ("VCBase", "HAS_XFORM_KEYS", "HAS_FLEN_KEYS")
+
+# Flags returned by VCBase.get_camera_has_keys()
+HAS_XFORM_KEYS = 1
+HAS_FLEN_KEYS = 2
+
+
+def _lazy_dict(obj, name):
+    # State used by the method wrappers is created on first use, so
+    # subclasses don't need to call VCBase.__init__()
+    try:
+        return getattr(obj, name)
+    except AttributeError:
+        value = {}
+        setattr(obj, name, value)
+        return value
+
+
+# Methods of VCBase overloaded by subclasses are wrapped to add the
+# behaviour described in the VCBase docstring, with a pair of hooks:
+#
+#   before(self, *args) is called before the overload, returning _SKIP
+#   to skip calling it, or a value that is passed on to after().
+#   after(self, result, state, *args) is called after the overload with
+#   its result and the value returned by before(), and returns the result
+#   of the call.
+#
+# Each wrapper only acts from the most derived overload of the method,
+# so that calling the parent implementation with super() goes
+# straight to the wrapped function.
+
+_SKIP = object()
+
+
+def _wrap_method(name, func, before=None, after=None, opt_out=None):
+    # 'opt_out' is the name of a class attribute disabling the hooks
+    def bypass(self):
+        return (getattr(type(self), name) is not wrapper
+                or (opt_out is not None and getattr(self, opt_out)))
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args):
+            if bypass(self):
+                return await func(self, *args)
+            state = None if before is None else before(self, *args)
+            if state is _SKIP:
+                return None
+            result = await func(self, *args)
+            return result if after is None else after(self, result, state, *args)
+    else:
+        @functools.wraps(func)
+        def wrapper(self, *args):
+            if bypass(self):
+                return func(self, *args)
+            state = None if before is None else before(self, *args)
+            if state is _SKIP:
+                return None
+            result = func(self, *args)
+            return result if after is None else after(self, result, state, *args)
 
-__all__ = ("VCBase",)
+    wrapper._vcbase_wrapper = True
+    return wrapper
+
+
+def _check_transform(self, vcserver, camera_name, transform_matrix):
+    matrix = array("d", transform_matrix)
+    if _lazy_dict(self, "_last_xform").get(camera_name) == matrix:
+        return _SKIP
+    return matrix
 
 
-class VCBase(metaclass=ABCMeta):
-    """ Abstract base class that must be overloaded to implement most
+def _store_transform(self, result, matrix, vcserver, camera_name, transform_matrix):
+    _lazy_dict(self, "_last_xform")[camera_name] = matrix
+    return result
+
+
+def _check_focal_length(self, vcserver, camera_name, focal_length):
+    if _lazy_dict(self, "_last_flen").get(camera_name) == focal_length:
+        return _SKIP
+
+
+def _store_focal_length(self, result, state, vcserver, camera_name, focal_length):
+    _lazy_dict(self, "_last_flen")[camera_name] = focal_length
+    return result
+
+
+# Guards the pending frame of _coalesce_frames(), as set_frame() and the
+# deferred call setting the frame may run on different threads
+_pending_frame_lock = threading.Lock()
+
+
+def _coalesce_frames(self, vcserver, frame):
+    if self._skip_frame_coalescing:
+        return None
+    with _pending_frame_lock:
+        already_pending = getattr(self, "_pending_frame", None) is not None
+        self._pending_frame = frame
+    if already_pending:
+        return _SKIP
+    # The overload wrapped by the most derived set_frame()
+    set_frame = type(self).set_frame.__wrapped__
+
+    def set_pending_frame():
+        with _pending_frame_lock:
+            pending_frame = self._pending_frame
+            self._pending_frame = None
+        set_frame(self, vcserver, pending_frame)
+        _frame_changed(self, None, None, vcserver, pending_frame)
+
+    try:
+        deferred = self.call_deferred(vcserver, set_pending_frame)
+    except BaseException:
+        with _pending_frame_lock:
+            self._pending_frame = None
+        raise
+    if not deferred:
+        set_pending_frame()
+    return _SKIP
+
+
+def _frame_changed(self, result, state, vcserver, frame):
+    # Animated cameras may have moved
+    self.invalidate_transform_cache()
+    return result
+
+
+def _check_playback_started(self, vcserver, forward):
+    if (getattr(self, "_playing", None)
+            and getattr(self, "_playing_forward", None) == forward):
+        return _SKIP
+
+
+def _playback_started(self, result, state, vcserver, forward):
+    self._playing = True
+    self._playing_forward = forward
+    return result
+
+
+def _check_playback_stopped(self, vcserver):
+    if getattr(self, "_playing", None) is False:
+        return _SKIP
+
+
+def _playback_stopped(self, result, state, vcserver):
+    self._playing = False
+    return result
+
+
+def _check_view_camera(self, vcserver, camera_name):
+    if getattr(self, "_current_view_camera", None) == camera_name:
+        return _SKIP
+
+
+def _view_camera_set(self, result, state, vcserver, camera_name):
+    self._current_view_camera = camera_name
+    return result
+
+
+def _keys_bitmask(self, has_keys, state, vcserver, camera_name):
+    if isinstance(has_keys, int):
+        return has_keys
+    transform_has_keys, focal_length_has_keys = has_keys
+    return ((HAS_XFORM_KEYS if transform_has_keys else 0)
+            | (HAS_FLEN_KEYS if focal_length_has_keys else 0))
+
+
+def _mark_capture_started(self, result, state, vcserver):
+    self._capture_started = True
+    return result
+
+
+def _mark_capture_ended(self, vcserver):
+    self._capture_started = False
+
+
+def _camera_created(self, result, state, vcserver):
+    self.invalidate_camera_cache()
+    return result
+
+
+def _camera_keys_changed(self, result, state, vcserver, camera_name, *args):
+    # For methods receiving 'camera_name' that may change the transform
+    # or the focal length of the camera without going through
+    # set_camera_transform() or set_camera_focal_length()
+    self.invalidate_transform_cache(camera_name)
+    return result
+
+
+def _session_changed(self, vcserver, *args):
+    # For the connection callbacks, as the viewport camera or the playback
+    # may have been changed by the user while no app was connected, and
+    # keyframe chunks from an interrupted transfer will never be completed
+    self._reset_session_state()
+
+
+def _transform_keys_to_tuples(keyframes_arr, matrices_arr):
+    # Arguments of set_camera_transform_keys() from the buffers
+    # received by set_camera_transform_keys_buffer()
+    matrices = matrices_arr.tolist()
+    return (tuple(keyframes_arr.tolist()),
+            tuple(tuple(matrices[i:i+16]) for i in range(0, len(matrices), 16)))
+
+
+# Methods setting or removing keyframes, that move the camera
+# to wherever the new animation places it
+_KEYFRAME_METHODS = (
+    "set_camera_flen_keys",
+    "set_camera_flen_keys_buffer",
+    "set_camera_transform_keys",
+    "set_camera_transform_keys_buffer",
+    "set_camera_transform_keys_chunk",
+    "remove_camera_keys",
+)
+
+
+# Wrapped methods as {name: (before, after, opt_out)},
+# see _wrap_method()
+_METHOD_HOOKS = {
+    "set_frame": (_coalesce_frames, _frame_changed, None),
+    "start_playback": (_check_playback_started, _playback_started, "_skip_state_guards"),
+    "stop_playback": (_check_playback_stopped, _playback_stopped, "_skip_state_guards"),
+    "set_camera_transform": (_check_transform, _store_transform, "_skip_transform_cache"),
+    "set_camera_focal_length": (
+        _check_focal_length, _store_focal_length, "_skip_transform_cache"),
+    "get_camera_has_keys": (None, _keys_bitmask, None),
+    "create_new_camera": (None, _camera_created, None),
+    "capture_will_start": (None, _mark_capture_started, None),
+    "capture_did_end": (_mark_capture_ended, None, None),
+    "look_through_camera": (_check_view_camera, _view_camera_set, "_skip_state_guards"),
+}
+_METHOD_HOOKS.update(
+    (name, (None, _camera_keys_changed, None)) for name in _KEYFRAME_METHODS)
+_METHOD_HOOKS.update(
+    (name, (_session_changed, None, None))
+    for name in ("client_connected", "client_disconnected"))
+
+# Hooks for methods overloaded as coroutines, see virtucamera.VCBaseAsync.
+# They are awaited by the server as soon as they are called,
+# so there's no event loop tick in which to merge set_frame() calls.
+_ASYNC_METHOD_HOOKS = dict(_METHOD_HOOKS, set_frame=(None, _frame_changed, None))
+
+
+class VCBase:
+    """ Base class that must be overloaded to implement most
     of its methods, where each method is dedicated to set or get some
     specific data related to the scene, the cameras, viewport capturing,
     server feedback, and custom script calling.
@@ -37,13 +281,148 @@ class VCBase(metaclass=ABCMeta):
     All methods will always receive the instance of virtucamera.VCServer
     that is calling them as the second argument 'vcserver'.
     This can be used to access the server API as needed.
+
+    The methods listed in VCBase._REQUIRED must be overloaded, otherwise
+    a TypeError is raised as soon as the subclass is defined. An intermediate
+    class that is not meant to be used directly can skip that check
+    by declaring itself as abstract:
+
+        class MyPluginBase(VCBase, abstract=True):
+            ...
+
+    When a subclass is defined, every method listed in VCBase._CALLBACKS
+    is resolved once and stored in the class as '_slot_<method name>',
+    which is what virtucamera.VCServer calls. Reassigning those methods
+    on the instance or the class after that has no effect.
+
+    Calls to set_camera_transform() and set_camera_focal_length() that
+    repeat the last value set on the same camera are skipped, so that
+    your application doesn't update the scene when nothing changed.
+    The last values are forgotten when a frame is set, when keyframes
+    are set or removed on the camera, when VCBase.invalidate_camera_cache()
+    is called and when a client app connects or disconnects. If the camera can be modified by
+    something else between calls, call VCBase.invalidate_transform_cache()
+    when that happens, or disable the cache in your subclass with:
+
+        _skip_transform_cache = True
+
+    If VCBase.call_deferred() is overloaded, successive calls to set_frame()
+    received before your application gets to process them are merged,
+    and only the last frame is set. If every frame must be set, disable
+    it in your subclass with:
+
+        _skip_frame_coalescing = True
+
+    Calls to look_through_camera(), start_playback() and stop_playback()
+    that request the state already set by the previous call are skipped too.
+    That state is forgotten whenever a client app connects or disconnects,
+    and the viewport camera also when VCBase.invalidate_camera_cache()
+    is called.
+    If the viewport camera or the playback can be changed by something else,
+    call VCBase.invalidate_view_state() when that happens, or disable
+    these checks in your subclass with:
+
+        _skip_state_guards = True
+
+    VCBase keeps the state needed for all of the above in the instance
+    '__dict__', so subclasses that are not abstract must have one. If you
+    declare '__slots__' in your subclass, include '__dict__' in it.
     """
 
+    __slots__ = ()
+
+    _skip_transform_cache = False
+    _skip_frame_coalescing = False
+    _skip_state_guards = False
+
+    # Methods that every subclass must overload, in the order
+    # virtucamera.VCServer binds them.
+    _REQUIRED = (
+        "get_playback_state",
+        "get_playback_fps",
+        "set_frame",
+        "set_playback_range",
+        "start_playback",
+        "stop_playback",
+        "get_scene_cameras",
+        "get_camera_has_keys",
+        "get_camera_focal_length",
+        "get_camera_transform",
+        "set_camera_focal_length",
+        "set_camera_transform",
+        "set_camera_flen_keys",
+        "set_camera_transform_keys",
+        "remove_camera_keys",
+        "create_new_camera",
+        "capture_will_start",
+        "capture_did_end",
+        "look_through_camera",
+    )
+
+    # Every method called by virtucamera.VCServer, required or not.
+    _CALLBACKS = _REQUIRED + (
+        "get_notifies_changes",
+        "get_scene_camera_ids",
+        "get_playback_state_into",
+        "get_camera_exists",
+        "get_scene_cameras_transforms",
+        "set_camera_flen_keys_buffer",
+        "set_camera_transform_keys_buffer",
+        "set_camera_transform_keys_chunk",
+        "get_capture_coords",
+        "get_capture_buffer",
+        "get_capture_pointer",
+        "get_capture_pointer_stride",
+        "get_capture_ringbuffer",
+        "client_connected",
+        "client_disconnected",
+        "current_camera_changed",
+        "server_did_stop",
+        "get_script_labels",
+        "execute_script",
+    )
+
+    def __init_subclass__(cls, abstract=False, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name in _METHOD_HOOKS:
+            func = cls.__dict__.get(name)
+            if not callable(func) or getattr(func, "_vcbase_wrapper", False):
+                continue
+            if inspect.iscoroutinefunction(func):
+                hooks = _ASYNC_METHOD_HOOKS.get(name)
+            else:
+                hooks = _METHOD_HOOKS[name]
+            if hooks is not None:
+                setattr(cls, name, _wrap_method(name, func, *hooks))
+        # Resolve the MRO once, so calling a method from the server
+        # is a single attribute fetch on the class.
+        for name in cls._CALLBACKS:
+            setattr(cls, "_slot_" + name, getattr(cls, name))
+        if abstract:
+            return
+        if not cls.__dictoffset__:
+            raise TypeError(
+                "Can't define {} without an instance '__dict__', add "
+                "'__dict__' to its __slots__".format(cls.__name__))
+        missing = [name for name in cls._REQUIRED
+                   if getattr(cls, name) is getattr(VCBase, name)]
+        if missing:
+            raise TypeError(
+                "Can't define {} without overloading the required "
+                "methods: {}".format(cls.__name__, ", ".join(missing)))
+
+    def __del__(self):
+        # Last chance to release capture resources if the capture
+        # was never ended, see VCBase.capture_did_end(). A coroutine
+        # can't be awaited from here, so it's not called at all.
+        if (getattr(self, "_capture_started", False)
+                and not inspect.iscoroutinefunction(type(self).capture_did_end)):
+            self.capture_did_end(None)
+
 
     # SCENE STATE RELATED METHODS:
     # ---------------------------
 
-    @abstractmethod
     def get_playback_state(self, vcserver):
         """ Must Return the playback state of the scene as a tuple or list
         in the following order: (current_frame, range_start, range_end)
@@ -64,7 +443,25 @@ class VCBase(metaclass=ABCMeta):
 
         pass
 
-    @abstractmethod
+    def get_playback_state_into(self, vcserver, out):
+        """ Optional, same as VCBase.get_playback_state() but the playback
+        state is written into 'out', a buffer of 3 float32 owned by
+        the server and reused between calls, instead of being returned.
+
+        By default it calls VCBase.get_playback_state() and copies
+        the values. Overload it to write the values directly
+        and avoid creating a tuple on every call.
+
+        Parameters
+        ----------
+        vcserver : virtucamera.VCServer object
+            Instance of virtucamera.VCServer calling this method.
+        out : memoryview of 3 float32
+            Buffer to write (current_frame, range_start, range_end) into.
+        """
+
+        out[0], out[1], out[2] = self.get_playback_state(vcserver)
+
     def get_playback_fps(self, vcserver):
         """ Must return a float value with the scene playback rate
         in Frames Per Second.
@@ -82,7 +479,6 @@ class VCBase(metaclass=ABCMeta):
 
         pass
 
-    @abstractmethod
     def set_frame(self, vcserver, frame):
         """ Must set the current frame number on the scene
 
@@ -96,7 +492,34 @@ class VCBase(metaclass=ABCMeta):
 
         pass
 
-    @abstractmethod
+    def call_deferred(self, vcserver, function):
+        """ Optional, it can schedule 'function' to be called once,
+        without arguments, the next time the event loop of your application
+        is idle, and return True. Returns False by default, meaning
+        that nothing was scheduled and 'function' must be called right away.
+
+        Used to set only the last of several frames requested in quick
+        succession by the app, check VCBase._skip_frame_coalescing.
+        Some options are maya.utils.executeDeferred() or
+        QTimer.singleShot(0, function) in Maya, and
+        bpy.app.timers.register(function) in Blender, wrapping 'function'
+        so that it returns None.
+
+        Parameters
+        ----------
+        vcserver : virtucamera.VCServer object
+            Instance of virtucamera.VCServer calling this method.
+        function : callable
+            Function to be called once.
+
+        Returns
+        -------
+        bool
+            'True' if 'function' has been scheduled, 'False' otherwise.
+        """
+
+        return False
+
     def set_playback_range(self, vcserver, start, end):
         """ Must set the animation frame range on the scene
 
@@ -112,7 +535,6 @@ class VCBase(metaclass=ABCMeta):
 
         pass
         
-    @abstractmethod
     def start_playback(self, vcserver, forward):
         """ This method must start the playback of animation in the scene.
         Not used at the moment, but must be implemented just in case
@@ -129,7 +551,6 @@ class VCBase(metaclass=ABCMeta):
 
         pass
 
-    @abstractmethod
     def stop_playback(self, vcserver):
         """ This method must stop the playback of animation in the scene.
         Not used at the moment, but must be implemented just in case
@@ -143,11 +564,44 @@ class VCBase(metaclass=ABCMeta):
 
         pass
 
+    def get_notifies_changes(self, vcserver):
+        """ Optional, must return True if your implementation notifies
+        the server about changes in the scene, so that it doesn't need
+        to keep requesting the playback state and the camera transforms
+        while nothing happens. Returns False by default.
+
+        If you return True, you must call these methods whenever
+        the corresponding data changes in your 3D software:
+        * vcserver.notify_playback_changed(current_frame, range_start, range_end)
+        * vcserver.notify_transform_changed(camera_name, transform_matrix)
+        where the arguments follow the same rules as the return values of
+        VCBase.get_playback_state() and VCBase.get_camera_transform().
+        Use the change callbacks of your 3D software to do so, like
+        MEventMessage.addEventCallback("timeChanged", ...) and
+        MNodeMessage.addNodeDirtyPlugCallback() in Maya, or
+        bpy.app.handlers.frame_change_post and depsgraph_update_post
+        in Blender.
+
+        When a transform changes outside of VirtuCamera, also call
+        VCBase.invalidate_transform_cache() for that camera.
+
+        Parameters
+        ----------
+        vcserver : virtucamera.VCServer object
+            Instance of virtucamera.VCServer calling this method.
+
+        Returns
+        -------
+        bool
+            'True' if scene changes are notified to the server, 'False' otherwise.
+        """
+
+        return False
+
 
     # CAMERA RELATED METHODS:
     # -----------------------
 
-    @abstractmethod
     def get_scene_cameras(self, vcserver):
         """ Must Return a list or tuple with the names of all the scene cameras.
 
@@ -164,11 +618,66 @@ class VCBase(metaclass=ABCMeta):
 
         pass
 
-    @abstractmethod
+    def get_scene_camera_ids(self, vcserver):
+        """ Optional, same as VCBase.get_scene_cameras() but each camera
+        is returned together with an int that identifies it, as provided
+        by VCBase.get_camera_id(), so that the server can refer to cameras
+        by that number instead of by name.
+
+        By default it calls VCBase.get_scene_cameras() and assigns
+        an id to every name.
+
+        Parameters
+        ----------
+        vcserver : virtucamera.VCServer object
+            Instance of virtucamera.VCServer calling this method.
+
+        Returns
+        -------
+        list of tuples of (int, str)
+            (camera_id, camera_name) for all the scene cameras.
+        """
+
+        camera_names = self.get_scene_cameras(vcserver)
+        self._scene_cameras_received(camera_names)
+        return [(self.get_camera_id(camera_name), camera_name)
+                for camera_name in camera_names]
+
+    def resolve_camera_handle(self, vcserver, camera_name):
+        """ Optional, it can return the object your 3D software uses to
+        access the specified camera (e.g. an MDagPath in Maya or a bpy
+        object in Blender), so that looking it up by name is only done once.
+        VCBase.get_camera_handle() caches the result until
+        VCBase.invalidate_camera_cache() is called.
+        Returns 'camera_name' by default.
+
+        Parameters
+        ----------
+        vcserver : virtucamera.VCServer object
+            Instance of virtucamera.VCServer calling this method.
+        camera_name : str
+            Name of the camera to resolve.
+
+        Returns
+        -------
+        object
+            handle to the camera 'camera_name' in your 3D software.
+        """
+
+        return camera_name
+
     def get_camera_exists(self, vcserver, camera_name):
         """ Must Return True if the specified camera exists in the scene,
         False otherwise.
 
+        By default it looks up the name in the cameras returned by
+        VCBase.get_scene_cameras(), which are only requested again after
+        VCBase.invalidate_camera_cache() is called. If you rely on
+        the default, call that method from a callback of your 3D software
+        whenever cameras are added, deleted or renamed
+        (e.g. MSceneMessage in Maya or depsgraph_update_post in Blender),
+        otherwise overload this method.
+
         Parameters
         ----------
         vcserver : virtucamera.VCServer object
@@ -182,13 +691,21 @@ class VCBase(metaclass=ABCMeta):
             'True' if the camera 'camera_name' exists, 'False' otherwise.
         """
 
-        pass
+        cameras = self._get_cached_scene_cameras()
+        if cameras is None:
+            cameras = self._scene_cameras_received(self.get_scene_cameras(vcserver))
+        return camera_name in cameras
 
-    @abstractmethod
     def get_camera_has_keys(self, vcserver, camera_name):
         """ Must Return whether the specified camera has animation keyframes
-        in the transform or flocal length parameters, as a tuple or list,
-        in the following order: (transform_has_keys, focal_length_has_keys)
+        in the transform or flocal length parameters, as an int combining
+        the following flags with the '|' operator:
+        * HAS_XFORM_KEYS - The transform has keyframes.
+        * HAS_FLEN_KEYS - The focal length has keyframes.
+
+        A tuple or list in the following order is also accepted,
+        and converted to the flags above before reaching the server:
+        (transform_has_keys, focal_length_has_keys)
         * transform_has_keys (bool) - True if the transform has keyframes.
         * focal_length_has_keys (bool) - True if the flen has keyframes.
 
@@ -201,14 +718,14 @@ class VCBase(metaclass=ABCMeta):
 
         Returns
         -------
-        tuple or list of 2 bool
-            whether the camera 'camera_name' has keys or not as
+        int
+            HAS_XFORM_KEYS and/or HAS_FLEN_KEYS if the camera 'camera_name'
+            has keys, 0 otherwise. Or tuple or list of 2 bool as
             (transform_has_keys, focal_length_has_keys)
         """
 
         pass
 
-    @abstractmethod
     def get_camera_focal_length(self, vcserver, camera_name):
         """ Must Return the focal length value of the specified camera.
 
@@ -227,7 +744,6 @@ class VCBase(metaclass=ABCMeta):
 
         pass
 
-    @abstractmethod
     def get_camera_transform(self, vcserver, camera_name):
         """ Must return a tuple or list of 16 floats with the 4x4
         transform matrix of the specified camera.
@@ -241,7 +757,8 @@ class VCBase(metaclass=ABCMeta):
             Being 'r' rotation and 't' translation,
 
         Is your responsability to rotate or transpose the matrix if needed,
-        most 3D softwares offer fast APIs to do so.
+        most 3D softwares offer fast APIs to do so. Otherwise, the helpers in
+        virtucamera.vc_utils do it without looping over the values in Python.
 
         Parameters
         ----------
@@ -259,7 +776,39 @@ class VCBase(metaclass=ABCMeta):
 
         pass
 
-    @abstractmethod
+    def get_scene_cameras_transforms(self, vcserver):
+        """ Optional, must return the names of all the scene cameras
+        together with their transform matrixes, in a single call.
+        The matrixes are returned as one contiguous float32 buffer with
+        16 floats per camera, one after the other in the same order
+        as the names, each one following the rules described in
+        VCBase.get_camera_transform().
+
+        By default it calls VCBase.get_scene_cameras() and then
+        VCBase.get_camera_transform() for every camera. Overload it if your
+        3D software can read all the matrixes at once, for example
+        iterating the cameras returned by a single cmds.ls(type="camera")
+        call in Maya and extending the buffer with each worldMatrix.
+
+        Parameters
+        ----------
+        vcserver : virtucamera.VCServer object
+            Instance of virtucamera.VCServer calling this method.
+
+        Returns
+        -------
+        tuple of 2 elements
+            (camera_names, matrices) where 'camera_names' is a tuple of N str
+            and 'matrices' is an array.array('f') or any other contiguous
+            float32 buffer with 16*N floats.
+        """
+
+        camera_names = tuple(self.get_scene_cameras(vcserver))
+        matrices = array("f")
+        for camera_name in camera_names:
+            matrices.extend(self.get_camera_transform(vcserver, camera_name))
+        return camera_names, matrices
+
     def set_camera_focal_length(self, vcserver, camera_name, focal_length):
         """ Must set the focal length of the specified camera.
 
@@ -275,11 +824,14 @@ class VCBase(metaclass=ABCMeta):
 
         pass
 
-    @abstractmethod
     def set_camera_transform(self, vcserver, camera_name, transform_matrix):
         """  Must set the transform of the specified camera.
-        The transform matrix is provided as a tuple of 16 floats
-        with a 4x4 transform matrix.
+        The transform matrix is provided as a read-only sequence of 16 floats
+        with a 4x4 transform matrix. It's a memoryview of a float32 buffer
+        owned by the server and reused on every call, so treat it as
+        a sequence (indexing, slicing, iterating, len()) and don't keep
+        references to it after this method returns. Use tuple() or
+        array.array() on it if you need to store the values.
 
         * The up axis is Y+
         * The order is:
@@ -290,7 +842,8 @@ class VCBase(metaclass=ABCMeta):
             Being 'r' rotation and 't' translation,
 
         Is your responsability to rotate or transpose the matrix if needed,
-        most 3D softwares offer fast APIs to do so.
+        most 3D softwares offer fast APIs to do so. Otherwise, the helpers in
+        virtucamera.vc_utils do it without looping over the values in Python.
 
         Parameters
         ----------
@@ -298,13 +851,12 @@ class VCBase(metaclass=ABCMeta):
             Instance of virtucamera.VCServer calling this method.
         camera_name : str
             Name of the camera to set the transform to.
-        transform_matrix : tuple of 16 floats
+        transform_matrix : memoryview of 16 float32
             transformation matrix to be set on the camera 'camera_name'
         """
 
         pass
 
-    @abstractmethod
     def set_camera_flen_keys(self, vcserver, camera_name, keyframes, focal_length_values):
         """ Must set keyframes on the focal length of the specified camera.
         The frame numbers are provided as a tuple of floats and
@@ -329,7 +881,35 @@ class VCBase(metaclass=ABCMeta):
 
         pass
 
-    @abstractmethod
+    def set_camera_flen_keys_buffer(self, vcserver, camera_name, keyframes_arr, focal_length_arr):
+        """ Optional, same as VCBase.set_camera_flen_keys() but the data
+        is provided as two contiguous float32 buffers of the same length
+        instead of tuples, so that it can be passed to the vectorized
+        key-setting API of your 3D software without creating a Python
+        object per value (e.g. MFnAnimCurve.addKeys() in Maya, or
+        keyframe_points.foreach_set("co", ...) in Blender after interleaving
+        frames and values).
+
+        By default it converts the buffers to tuples and calls
+        VCBase.set_camera_flen_keys(). If you overload this method,
+        set_camera_flen_keys() can be reduced to a thin wrapper that
+        packs its arguments with array.array('f', ...) and calls this one.
+
+        Parameters
+        ----------
+        vcserver : virtucamera.VCServer object
+            Instance of virtucamera.VCServer calling this method.
+        camera_name : str
+            Name of the camera to set the keyframes to.
+        keyframes_arr : memoryview of float32
+            Frame numbers to create the keyframes on.
+        focal_length_arr : memoryview of float32
+            focal length values to be set as keyframes on the camera 'camera_name'
+        """
+
+        self.set_camera_flen_keys(
+            vcserver, camera_name, tuple(keyframes_arr.tolist()), tuple(focal_length_arr.tolist()))
+
     def set_camera_transform_keys(self, vcserver, camera_name, keyframes, transform_matrix_values):
         """ Must set keyframes on the transform of the specified camera.
         The frame numbers are provided as a tuple of floats and
@@ -365,7 +945,111 @@ class VCBase(metaclass=ABCMeta):
 
         pass
 
-    @abstractmethod
+    def set_camera_transform_keys_buffer(self, vcserver, camera_name, keyframes_arr, matrices_arr):
+        """ Optional, same as VCBase.set_camera_transform_keys() but the data
+        is provided as two contiguous float32 buffers instead of tuples,
+        so that it can be passed to the vectorized key-setting API of
+        your 3D software without creating a Python object per value
+        (e.g. MFnAnimCurve.addKeys() in Maya or foreach_set() in Blender).
+
+        'keyframes_arr' contains N frame numbers and 'matrices_arr'
+        contains N 4x4 transform matrixes one after the other, 16*N floats
+        in total, with the same order and up axis described in
+        VCBase.set_camera_transform_keys(). If numpy is available,
+        numpy.frombuffer(matrices_arr, dtype=numpy.float32).reshape(-1, 16)
+        gives an (N,16) array without copying the data.
+
+        By default it converts the buffers to tuples and calls
+        VCBase.set_camera_transform_keys(). If you overload this method,
+        set_camera_transform_keys() can be reduced to a thin wrapper that
+        packs its arguments with array.array('f', ...) and calls this one.
+
+        Parameters
+        ----------
+        vcserver : virtucamera.VCServer object
+            Instance of virtucamera.VCServer calling this method.
+        camera_name : str
+            Name of the camera to set the keyframes to.
+        keyframes_arr : memoryview of float32
+            N frame numbers to create the keyframes on.
+        matrices_arr : memoryview of float32
+            16*N floats with the transformation matrixes, in row-major order,
+            to be set as keyframes on the camera 'camera_name'
+        """
+
+        self.set_camera_transform_keys(
+            vcserver, camera_name, *_transform_keys_to_tuples(keyframes_arr, matrices_arr))
+
+    def set_camera_transform_keys_chunk(self, vcserver, camera_name, chunk_index, chunk_count, keyframes_mv, matrices_mv):
+        """ Optional, used when the transform keyframes of a long take
+        are sent in several chunks, so that they don't need to be received
+        all at once. It's called once for every chunk, in order, with
+        'chunk_index' going from 0 to 'chunk_count' - 1. The buffers follow
+        the same rules described in VCBase.set_camera_transform_keys_buffer()
+        and are only valid until the method returns.
+
+        By default the chunks are accumulated, and when the last one is
+        received VCBase.set_camera_transform_keys_buffer() is called once
+        with all of them, so the keyframes are still set with a single call
+        to your 3D software. Receiving chunk 0 starts a new sequence for
+        the camera, discarding any unfinished one, and unfinished sequences
+        are also discarded when a client app connects or disconnects.
+        A chunk received out of order, with a 'chunk_count' different from
+        the one received with chunk 0, or with 'chunk_index' out of range
+        discards the sequence and raises ValueError.
+
+        Parameters
+        ----------
+        vcserver : virtucamera.VCServer object
+            Instance of virtucamera.VCServer calling this method.
+        camera_name : str
+            Name of the camera to set the keyframes to.
+        chunk_index : int
+            0-based index of this chunk.
+        chunk_count : int
+            Total number of chunks.
+        keyframes_mv : memoryview of float32
+            Frame numbers of the keyframes in this chunk.
+        matrices_mv : memoryview of float32
+            16 floats for every keyframe in this chunk, with the
+            transformation matrixes in row-major order.
+        """
+
+        keys = self._accumulate_keys_chunk(
+            camera_name, chunk_index, chunk_count, keyframes_mv, matrices_mv)
+        if keys is not None:
+            self.set_camera_transform_keys_buffer(vcserver, camera_name, *keys)
+
+    def _accumulate_keys_chunk(self, camera_name, chunk_index, chunk_count, keyframes_mv, matrices_mv):
+        # Add a chunk received by set_camera_transform_keys_chunk(), returning
+        # the buffers with the keyframes of all the chunks once the last one
+        # is added, None before that
+        key_accum = _lazy_dict(self, "_key_accum")
+        if not 0 <= chunk_index < chunk_count:
+            key_accum.pop(camera_name, None)
+            raise ValueError(
+                "Received invalid keyframes chunk {} of {} for camera '{}'".format(
+                    chunk_index, chunk_count, camera_name))
+        if chunk_index == 0:
+            # Starting a new sequence drops any unfinished one
+            key_accum[camera_name] = [0, chunk_count, array("f"), array("f")]
+        accum = key_accum.get(camera_name)
+        if accum is None or accum[0] != chunk_index or accum[1] != chunk_count:
+            key_accum.pop(camera_name, None)
+            expected_index, expected_count = (0, chunk_count) if accum is None else accum[:2]
+            raise ValueError(
+                "Received keyframes chunk {} of {} for camera '{}' out of order, "
+                "expected chunk {} of {}".format(
+                    chunk_index, chunk_count, camera_name, expected_index, expected_count))
+        accum[0] += 1
+        keyframes, matrices = accum[2], accum[3]
+        keyframes.frombytes(memoryview(keyframes_mv).cast("B"))
+        matrices.frombytes(memoryview(matrices_mv).cast("B"))
+        if chunk_index < chunk_count - 1:
+            return None
+        del key_accum[camera_name]
+        return memoryview(keyframes), memoryview(matrices)
+
     def remove_camera_keys(self, vcserver, camera_name):
         """ This method must remove all transform
         and focal length keyframes in the specified camera.
@@ -380,7 +1064,6 @@ class VCBase(metaclass=ABCMeta):
 
         pass
 
-    @abstractmethod
     def create_new_camera(self, vcserver):
         """ This method must create a new camera in the scene
         and return its name.
@@ -402,7 +1085,6 @@ class VCBase(metaclass=ABCMeta):
     # VIEWPORT CAPTURE RELATED METHODS:
     # ---------------------------------
 
-    @abstractmethod
     def capture_will_start(self, vcserver):
         """ This method is called whenever a client app requests a video
         feed from the viewport. Usefull to init a pixel buffer
@@ -412,8 +1094,23 @@ class VCBase(metaclass=ABCMeta):
         vcserver.set_capture_mode() here is a must. Please check
         the documentation for those methods.
 
+        vcserver.CAPMODE_BUFFER_POINTER is the recommended capture mode,
+        as the server reads the pixels straight from your buffer and
+        no Python object has to be created for every frame. Allocate
+        the buffer here and keep it alive, and at the same address if
+        possible, until VCBase.capture_did_end() is called. If the pixels
+        come from the GPU, map the buffer persistently
+        (e.g. glMapBufferRange(..., GL_MAP_PERSISTENT_BIT)) so that
+        the pointer stays valid across frames. For pixels read from the CPU,
+        VCBase._get_or_grow_capture_buffer() provides such a buffer.
+        vcserver.CAPMODE_BUFFER is deprecated and only remains for
+        environments that can't provide a raw memory address.
+
         You can also call vcserver.set_vertical_flip() here optionally,
         if you need to flip your pixel buffer. Disabled by default.
+        Prefer it over flipping the pixels yourself, as
+        virtucamera.vc_utils.flip_vertical() runs a Python loop over
+        the rows of the image and is much slower.
 
         Parameters
         ----------
@@ -424,14 +1121,21 @@ class VCBase(metaclass=ABCMeta):
         pass
 
     def capture_did_end(self, vcserver):
-        """ Optional, this method is called whenever a client app
-        stops the viewport video feed. Usefull to destroy a pixel buffer
-        or other objects you may have created to capture the viewport.
+        """ This method is called whenever a client app
+        stops the viewport video feed. It must destroy the pixel buffer
+        and any other objects you may have created to capture the viewport,
+        specially if they live in the GPU.
+
+        If the instance is destroyed while a capture is still running, for
+        example after the client disconnected abruptly, it's called one
+        last time with 'vcserver' being None, so that resources are
+        released anyway. The server API can't be used in that case.
 
         Parameters
         ----------
-        vcserver : virtucamera.VCServer object
-            Instance of virtucamera.VCServer calling this method.
+        vcserver : virtucamera.VCServer object or None
+            Instance of virtucamera.VCServer calling this method,
+            or None if called while the instance is being destroyed.
         """
 
         pass
@@ -474,6 +1178,10 @@ class VCBase(metaclass=ABCMeta):
         the viewport image. If you don't use CAPMODE_BUFFER,
         you don't need to overload this method.
 
+        DEPRECATED: a new Python object has to be handled for every frame
+        in this mode, use CAPMODE_BUFFER_POINTER and
+        VCBase.get_capture_pointer() instead whenever possible.
+
         If the capture resolution has changed in size from the previous call to
         this method, vcserver.set_capture_resolution() must be called here
         before returning. You can use vcserver.capture_width and
@@ -529,7 +1237,98 @@ class VCBase(metaclass=ABCMeta):
 
         pass
 
-    @abstractmethod
+    def get_capture_pointer_stride(self, vcserver, camera_name):
+        """ Optional, if vcserver.capture_mode == vcserver.CAPMODE_BUFFER_POINTER,
+        it can return a tuple with the memory address of the first row of
+        pixels and the distance in bytes between the start of two
+        consecutive rows, as (pointer, row_stride). This lets the server copy
+        the pixels row by row directly into its send buffer even if your
+        rows are padded, for example to satisfy a GPU alignment requirement.
+
+        The same rules described in VCBase.get_capture_pointer() apply
+        to the buffer. If this method is not overloaded, it returns None and
+        VCBase.get_capture_pointer() is called instead, assuming
+        rows without padding.
+
+        Parameters
+        ----------
+        vcserver : virtucamera.VCServer object
+            Instance of virtucamera.VCServer calling this method.
+        camera_name : str
+            Name of the camera that is currently selected in the App.
+
+        Returns
+        -------
+        tuple of 2 int
+            memory address of the first row and row stride in bytes
+            as (pointer, row_stride).
+        """
+
+        pass
+
+    def get_capture_ringbuffer(self, vcserver):
+        """ Optional, it can return a virtucamera.VCRingBuffer where your
+        application renders the viewport frames on its own schedule, so that
+        rendering and sending frames to the app overlap instead of blocking
+        each other. The server reads the frames from it in order and releases
+        each slot once it's sent. If this method is not overloaded, it returns
+        None and the frames are requested one by one with the method
+        matching vcserver.capture_mode.
+
+        It's called after VCBase.capture_will_start(), where the ring buffer
+        should be created with 'frame_bytes' matching the capture resolution.
+        Create it with low_latency=True (the default) to drop the oldest
+        frame when the network can't keep up, or with low_latency=False
+        to make your render loop wait for a free slot instead.
+
+        Parameters
+        ----------
+        vcserver : virtucamera.VCServer object
+            Instance of virtucamera.VCServer calling this method.
+
+        Returns
+        -------
+        virtucamera.VCRingBuffer
+            ring buffer the viewport frames are written to.
+        """
+
+        pass
+
+    def _get_or_grow_capture_buffer(self, width, height, bpp=4):
+        """ Helper that returns a pixel buffer big enough for the specified
+        resolution, to be used with vcserver.CAPMODE_BUFFER_POINTER.
+
+        A single buffer is kept for the instance and reused between frames
+        and captures. It's only reallocated when a bigger resolution
+        is requested, and it never shrinks, so rotating the device or
+        restarting the capture doesn't allocate memory again.
+        The memory address only changes when the buffer grows.
+
+        Parameters
+        ----------
+        width : int
+            Capture width in pixels.
+        height : int
+            Capture height in pixels.
+        bpp : int
+            Bytes per pixel.
+
+        Returns
+        -------
+        tuple of 2 int
+            (pointer, size) being 'pointer' the memory address of the buffer,
+            that can be returned from VCBase.get_capture_pointer(),
+            and 'size' the number of bytes used by the current resolution.
+        """
+
+        size = width * height * bpp
+        buffer = getattr(self, "_capture_buffer", None)
+        if buffer is None:
+            buffer = self._capture_buffer = ctypes.create_string_buffer(size)
+        elif ctypes.sizeof(buffer) < size:
+            ctypes.resize(buffer, size)
+        return ctypes.addressof(buffer), size
+
     def look_through_camera(self, vcserver, camera_name):
         """ This method must set the viewport to look through
         the specified camera.
@@ -563,7 +1362,7 @@ class VCBase(metaclass=ABCMeta):
             port number of the remote client
         """
 
-        pass
+        self._reset_session_state()
 
     def client_disconnected(self, vcserver):
         """ Optional, this method is called whenever a client app
@@ -577,7 +1376,7 @@ class VCBase(metaclass=ABCMeta):
             Instance of virtucamera.VCServer calling this method.
         """
 
-        pass
+        self._reset_session_state()
 
     def current_camera_changed(self, vcserver, current_camera):
         """ Optional, this method is called when the user selects
@@ -664,4 +1463,183 @@ class VCBase(metaclass=ABCMeta):
             Name of the currently selected camera
         """
 
-        return False
\ No newline at end of file
+        return False
+
+
+    # CACHE RELATED METHODS:
+    # ----------------------
+
+    def invalidate_transform_cache(self, camera_name=None):
+        """ Forget the last transform and focal length set on the specified
+        camera, or on all cameras if 'camera_name' is None, so that the next
+        call to set_camera_transform() or set_camera_focal_length()
+        is not skipped even if it repeats the previous value.
+
+        Call this if the camera can be modified by something other
+        than VirtuCamera, like the user or an animation curve.
+
+        Parameters
+        ----------
+        camera_name : str or None
+            Name of the camera to forget the values of, None for all cameras.
+        """
+
+        for name in ("_last_xform", "_last_flen"):
+            cache = _lazy_dict(self, name)
+            if camera_name is None:
+                cache.clear()
+            else:
+                cache.pop(camera_name, None)
+
+    @property
+    def scene_version(self):
+        """ int : Counter increased every time VCBase.invalidate_camera_cache()
+        is called, starting at 0. Values cached from the scene are only
+        valid while it doesn't change.
+        """
+
+        return getattr(self, "_scene_version", 0)
+
+    def invalidate_camera_cache(self):
+        """ Notify that cameras have been added, deleted or renamed in
+        the scene, so that the cached camera names used by the default
+        VCBase.get_camera_exists() are requested again, and the handles
+        returned by VCBase.get_camera_handle() are resolved again.
+        The last transforms and focal lengths set on the cameras
+        are forgotten too, see VCBase.invalidate_transform_cache().
+
+        It's called automatically after VCBase.create_new_camera().
+        Call it from the callbacks of your 3D software that report changes
+        in the scene, like MSceneMessage in Maya
+        or depsgraph_update_post in Blender.
+        """
+
+        self._scene_version = self.scene_version + 1
+        # The camera being looked through may have been renamed or replaced,
+        # and a new camera may reuse the name of a deleted one
+        self._current_view_camera = None
+        self.invalidate_transform_cache()
+
+    def invalidate_view_state(self):
+        """ Forget the camera set by the last call to look_through_camera()
+        and the playback state set by start_playback() or stop_playback(),
+        so that the next calls to those methods are not skipped.
+
+        Call this if the viewport camera or the playback can be changed
+        by something other than VirtuCamera, like the user.
+        """
+
+        self._current_view_camera = None
+        self._playing = None
+        self._playing_forward = None
+
+    def _get_cached_scene_cameras(self):
+        # Frozenset with the names of the scene cameras, or None if they
+        # haven't been received since scene_version last changed
+        if getattr(self, "_scene_cameras_version", None) != self.scene_version:
+            return None
+        return self._scene_cameras
+
+    def _scene_cameras_received(self, camera_names):
+        # Cache the names returned by get_scene_cameras(), dropping the ids
+        # and handles of the cameras that are not in the scene anymore
+        cameras = frozenset(camera_names)
+        name_to_id = _lazy_dict(self, "_name_to_id")
+        id_to_name = _lazy_dict(self, "_id_to_name")
+        id_to_handle = _lazy_dict(self, "_id_to_handle")
+        if getattr(self, "_scene_cameras_version", None) != self.scene_version:
+            id_to_handle.clear()
+        for camera_name in [name for name in name_to_id if name not in cameras]:
+            camera_id = name_to_id.pop(camera_name)
+            del id_to_name[camera_id]
+            id_to_handle.pop(camera_id, None)
+        self._scene_cameras = cameras
+        self._scene_cameras_version = self.scene_version
+        return cameras
+
+    def _reset_session_state(self):
+        # Called when a client app connects or disconnects
+        self.invalidate_view_state()
+        self.invalidate_transform_cache()
+        _lazy_dict(self, "_key_accum").clear()
+
+    def get_camera_id(self, camera_name):
+        """ Return an int that identifies the specified camera. The same
+        name always gets the same id while the camera is in the scene,
+        and different names always get different ids.
+
+        Ids are tied to names: a renamed camera gets a new id. Ids of
+        cameras that are deleted or renamed are forgotten the next time
+        the scene cameras are requested by VCBase.get_camera_exists(),
+        VCBase.get_scene_camera_ids() or VCBase.get_camera_handle(),
+        and they are never reused.
+
+        Parameters
+        ----------
+        camera_name : str
+            Name of the camera.
+
+        Returns
+        -------
+        int
+            id of the camera 'camera_name'.
+        """
+
+        name_to_id = _lazy_dict(self, "_name_to_id")
+        camera_id = name_to_id.get(camera_name)
+        if camera_id is None:
+            camera_id = name_to_id[camera_name] = getattr(self, "_next_camera_id", 0)
+            self._next_camera_id = camera_id + 1
+            _lazy_dict(self, "_id_to_name")[camera_id] = camera_name
+        return camera_id
+
+    def get_camera_name(self, camera_id):
+        """ Return the name of the camera identified by 'camera_id',
+        as returned by VCBase.get_camera_id(). KeyError is raised
+        if the id has been forgotten, see VCBase.get_camera_id().
+
+        Parameters
+        ----------
+        camera_id : int
+            id of the camera.
+
+        Returns
+        -------
+        str
+            name of the camera.
+        """
+
+        return _lazy_dict(self, "_id_to_name")[camera_id]
+
+    def get_camera_handle(self, vcserver, camera_id):
+        """ Return the object your 3D software uses to access the camera
+        identified by 'camera_id', as returned by
+        VCBase.resolve_camera_handle(). It's only resolved again after
+        VCBase.invalidate_camera_cache() is called, so you can call this
+        from any method receiving a camera name, with
+        self.get_camera_handle(vcserver, self.get_camera_id(camera_name)),
+        instead of looking up the camera in the scene every time.
+        KeyError is raised if the camera has been deleted or renamed
+        since its id was obtained.
+
+        Parameters
+        ----------
+        vcserver : virtucamera.VCServer object
+            Instance of virtucamera.VCServer calling this method.
+        camera_id : int
+            id of the camera.
+
+        Returns
+        -------
+        object
+            handle to the camera in your 3D software.
+        """
+
+        if self._get_cached_scene_cameras() is None:
+            self._scene_cameras_received(self.get_scene_cameras(vcserver))
+        id_to_handle = _lazy_dict(self, "_id_to_handle")
+        handle = id_to_handle.get(camera_id)
+        if handle is None:
+            handle = self.resolve_camera_handle(vcserver, self.get_camera_name(camera_id))
+            id_to_handle[camera_id] = handle
+        return handle
@@ -0,0 +1,186 @@
+# PyVirtuCamera
+# Copyright (c) 2021 Pablo Javier Garcia Gonzalez.
+#
+# Redistribution and use of the software module "PyVirtuCamera" (the “Software”)
+# is permitted, free of charge, provided that the following conditions are met:
+#     * Redistributions must reproduce the above copyright notice,
+#       this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * You may not decompile, disassemble, reverse engineer or modify
+#       any portion of the Software.
+#
+# THE SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDERS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THE SOFTWARE,
+# EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import asyncio
+import functools
+import inspect
+from array import array
+
+from .vc_base import VCBase, _lazy_dict, _transform_keys_to_tuples
+
+__all__ = ("VCBaseAsync",)
+
+
+# Defaults of VCBase that call other methods, which may be coroutines,
+# as (name, names of the methods it calls). If any of those is a
+# coroutine, the default is replaced by the coroutine defined in
+# VCBaseAsync as '_async_<name>', unless the method is overloaded.
+_ASYNC_DEFAULTS = (
+    ("get_playback_state_into", ("get_playback_state",)),
+    ("get_camera_exists", ("get_scene_cameras",)),
+    ("get_scene_camera_ids", ("get_scene_cameras",)),
+    ("get_scene_cameras_transforms", ("get_scene_cameras", "get_camera_transform")),
+    ("set_camera_flen_keys_buffer", ("set_camera_flen_keys",)),
+    ("set_camera_transform_keys_buffer", ("set_camera_transform_keys",)),
+    # After set_camera_transform_keys_buffer(), as it may have been replaced
+    ("set_camera_transform_keys_chunk", ("set_camera_transform_keys_buffer",)),
+    ("get_camera_handle", ("get_scene_cameras", "resolve_camera_handle")),
+)
+
+
+async def _resolve(value):
+    # Result of calling a method that may or may not be a coroutine
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
+class VCBaseAsync(VCBase, abstract=True):
+    """ Same as virtucamera.VCBase, but any of its methods can be
+    overloaded as a coroutine with 'async def'. The server awaits those
+    from its asyncio event loop, so it can keep serving the network
+    while your application is busy, and calls the rest directly as usual.
+
+    Which methods are coroutines is checked once when the subclass is
+    defined, and stored as a frozenset of method names in
+    VCBaseAsync._async_callbacks.
+
+    Most 3D software APIs can only be used from the main thread, so
+    a coroutine that needs to call them can hand the work to an executor
+    with VCBaseAsync.run_in_dcc(). Set '_dcc_executor' in your subclass
+    to a concurrent.futures.Executor that runs the functions where your
+    3D software allows it. If it's None, the default executor
+    of the event loop is used.
+
+    The optional methods whose default implementation in virtucamera.VCBase
+    calls other methods, like get_camera_exists() calling
+    get_scene_cameras(), become coroutines too when any of the methods
+    they call is a coroutine, unless you overload them. The same goes
+    for VCBase.get_camera_handle(), that must then be awaited.
+
+    Coroutines keep the behaviour described in virtucamera.VCBase:
+    repeated calls are skipped, the transform cache is forgotten once
+    set_frame() or a keyframe method has been awaited, and the result of
+    get_camera_has_keys() is converted to flags. The only difference is
+    that set_frame() calls are not merged, every one of them is awaited.
+
+    The last call to capture_did_end(None) is an exception,
+    made when the instance is destroyed with a capture still running:
+    it can't be awaited at that point, so it's skipped if capture_did_end()
+    is a coroutine. Overload it with a plain 'def' if your capture
+    resources must be released in that case.
+    """
+
+    __slots__ = ()
+
+    _dcc_executor = None
+    _async_callbacks = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name, dependencies in _ASYNC_DEFAULTS:
+            default = getattr(VCBase, name)
+            async_default = getattr(VCBaseAsync, "_async_" + name)
+            if getattr(cls, name) not in (default, async_default):
+                continue
+            if any(inspect.iscoroutinefunction(getattr(cls, dependency))
+                   for dependency in dependencies):
+                default = async_default
+            if getattr(cls, name) is not default:
+                setattr(cls, name, default)
+                if name in cls._CALLBACKS:
+                    setattr(cls, "_slot_" + name, default)
+        cls._async_callbacks = frozenset(
+            name for name in cls._CALLBACKS
+            if inspect.iscoroutinefunction(getattr(cls, name)))
+
+    async def run_in_dcc(self, function, *args):
+        """ Call 'function' with the specified arguments
+        in VCBaseAsync._dcc_executor and wait for its result without
+        blocking the event loop.
+
+        Parameters
+        ----------
+        function : callable
+            Function to be called.
+        *args
+            Arguments to call 'function' with.
+
+        Returns
+        -------
+        object
+            value returned by 'function'.
+        """
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._dcc_executor, functools.partial(function, *args))
+
+    # Coroutine versions of the VCBase defaults, see _ASYNC_DEFAULTS
+
+    async def _async_get_playback_state_into(self, vcserver, out):
+        out[0], out[1], out[2] = await _resolve(self.get_playback_state(vcserver))
+
+    async def _async_get_camera_exists(self, vcserver, camera_name):
+        cameras = self._get_cached_scene_cameras()
+        if cameras is None:
+            cameras = self._scene_cameras_received(
+                await _resolve(self.get_scene_cameras(vcserver)))
+        return camera_name in cameras
+
+    async def _async_get_scene_camera_ids(self, vcserver):
+        camera_names = await _resolve(self.get_scene_cameras(vcserver))
+        self._scene_cameras_received(camera_names)
+        return [(self.get_camera_id(camera_name), camera_name)
+                for camera_name in camera_names]
+
+    async def _async_get_scene_cameras_transforms(self, vcserver):
+        camera_names = tuple(await _resolve(self.get_scene_cameras(vcserver)))
+        matrices = array("f")
+        for camera_name in camera_names:
+            matrices.extend(await _resolve(self.get_camera_transform(vcserver, camera_name)))
+        return camera_names, matrices
+
+    async def _async_set_camera_flen_keys_buffer(self, vcserver, camera_name, keyframes_arr, focal_length_arr):
+        await _resolve(self.set_camera_flen_keys(
+            vcserver, camera_name, tuple(keyframes_arr.tolist()), tuple(focal_length_arr.tolist())))
+
+    async def _async_set_camera_transform_keys_buffer(self, vcserver, camera_name, keyframes_arr, matrices_arr):
+        await _resolve(self.set_camera_transform_keys(
+            vcserver, camera_name, *_transform_keys_to_tuples(keyframes_arr, matrices_arr)))
+
+    async def _async_set_camera_transform_keys_chunk(self, vcserver, camera_name, chunk_index, chunk_count, keyframes_mv, matrices_mv):
+        keys = self._accumulate_keys_chunk(
+            camera_name, chunk_index, chunk_count, keyframes_mv, matrices_mv)
+        if keys is not None:
+            await _resolve(self.set_camera_transform_keys_buffer(vcserver, camera_name, *keys))
+
+    async def _async_get_camera_handle(self, vcserver, camera_id):
+        if self._get_cached_scene_cameras() is None:
+            self._scene_cameras_received(await _resolve(self.get_scene_cameras(vcserver)))
+        id_to_handle = _lazy_dict(self, "_id_to_handle")
+        handle = id_to_handle.get(camera_id)
+        if handle is None:
+            handle = await _resolve(
+                self.resolve_camera_handle(vcserver, self.get_camera_name(camera_id)))
+            id_to_handle[camera_id] = handle
+        return handle
@@ -0,0 +1,173 @@
+# PyVirtuCamera
+# Copyright (c) 2021 Pablo Javier Garcia Gonzalez.
+#
+# Redistribution and use of the software module "PyVirtuCamera" (the “Software”)
+# is permitted, free of charge, provided that the following conditions are met:
+#     * Redistributions must reproduce the above copyright notice,
+#       this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * You may not decompile, disassemble, reverse engineer or modify
+#       any portion of the Software.
+#
+# THE SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDERS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THE SOFTWARE,
+# EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import ctypes
+import threading
+from collections import deque
+
+__all__ = ("VCRingBuffer",)
+
+
+class VCRingBuffer:
+    """ Fixed pool of pre-allocated frame slots, used to hand viewport
+    frames from the thread rendering them (the producer) to the thread
+    sending them to the app (the consumer) without blocking each other.
+
+    All the slots live in a single contiguous block of memory allocated
+    once, so no memory is allocated while capturing. Each slot can be
+    accessed as a raw memory address with VCRingBuffer.pointer()
+    or as a writable memoryview with VCRingBuffer.view().
+
+    Frames are consumed in the same order they are produced. If the
+    producer needs a slot and all of them are waiting to be sent, in
+    low latency mode the oldest waiting frame is dropped and its slot
+    reused, otherwise the producer blocks until a slot is released.
+    Either way memory usage never grows beyond the initial allocation.
+
+    Intended for a single producer and a single consumer.
+
+    Usage from the producer:
+
+        slot = ringbuffer.begin_write()
+        # ... render into ringbuffer.pointer(slot) ...
+        ringbuffer.end_write(slot)
+
+    Usage from the consumer:
+
+        slot = ringbuffer.begin_read(timeout)
+        if slot is not None:
+            # ... send ringbuffer.view(slot) ...
+            ringbuffer.end_read(slot)
+    """
+
+    def __init__(self, n_slots, frame_bytes, low_latency=True):
+        """
+        Parameters
+        ----------
+        n_slots : int
+            Number of frame slots, at least 2.
+        frame_bytes : int
+            Size in bytes of every slot, usually width * height * 4.
+        low_latency : bool
+            If True, drop the oldest waiting frame when there are no free
+            slots, instead of blocking the producer.
+        """
+
+        if n_slots < 2:
+            raise ValueError("VCRingBuffer needs at least 2 slots")
+        if frame_bytes <= 0:
+            raise ValueError("frame_bytes must be greater than 0")
+
+        self.n_slots = n_slots
+        self.frame_bytes = frame_bytes
+        self.low_latency = low_latency
+        self.dropped_frames = 0
+
+        self._memory = (ctypes.c_ubyte * (n_slots * frame_bytes))()
+        self._address = ctypes.addressof(self._memory)
+        self._views = tuple(
+            memoryview(self._memory).cast("B")[i*frame_bytes:(i+1)*frame_bytes]
+            for i in range(n_slots))
+        self._free = deque(range(n_slots))
+        self._ready = deque()
+        self._condition = threading.Condition(threading.Lock())
+
+    def pointer(self, slot):
+        """ Return the memory address of the first byte of 'slot' as an int. """
+
+        return self._address + slot * self.frame_bytes
+
+    def view(self, slot):
+        """ Return a writable memoryview of 'frame_bytes' bytes over 'slot'. """
+
+        return self._views[slot]
+
+    def begin_write(self, timeout=None):
+        """ Claim a slot to write a new frame into.
+
+        Parameters
+        ----------
+        timeout : float or None
+            Max seconds to wait for a free slot when not in low latency mode,
+            None to wait forever.
+
+        Returns
+        -------
+        int or None
+            index of the claimed slot, None if 'timeout' expired.
+        """
+
+        with self._condition:
+            if not self._free:
+                if self.low_latency and self._ready:
+                    self._free.append(self._ready.popleft())
+                    self.dropped_frames += 1
+                elif not self._condition.wait_for(lambda: self._free, timeout):
+                    return None
+            return self._free.popleft()
+
+    def end_write(self, slot):
+        """ Mark 'slot', previously claimed with VCRingBuffer.begin_write(),
+        as ready to be read.
+        """
+
+        with self._condition:
+            self._ready.append(slot)
+            self._condition.notify_all()
+
+    def begin_read(self, timeout=None):
+        """ Claim the oldest slot that is ready to be read.
+
+        Parameters
+        ----------
+        timeout : float or None
+            Max seconds to wait for a frame, None to wait forever.
+
+        Returns
+        -------
+        int or None
+            index of the claimed slot, None if 'timeout' expired.
+        """
+
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._ready, timeout):
+                return None
+            return self._ready.popleft()
+
+    def end_read(self, slot):
+        """ Release 'slot', previously claimed with VCRingBuffer.begin_read(),
+        so that it can be written again.
+        """
+
+        with self._condition:
+            self._free.append(slot)
+            self._condition.notify_all()
+
+    def clear(self):
+        """ Drop all the frames waiting to be read. Slots currently claimed
+        by the producer or the consumer are not affected.
+        """
+
+        with self._condition:
+            self._free.extend(self._ready)
+            self._ready.clear()
+            self._condition.notify_all()
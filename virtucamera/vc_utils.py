@@ -0,0 +1,143 @@
+# PyVirtuCamera
+# Copyright (c) 2021 Pablo Javier Garcia Gonzalez.
+#
+# Redistribution and use of the software module "PyVirtuCamera" (the “Software”)
+# is permitted, free of charge, provided that the following conditions are met:
+#     * Redistributions must reproduce the above copyright notice,
+#       this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * You may not decompile, disassemble, reverse engineer or modify
+#       any portion of the Software.
+#
+# THE SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDERS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THE SOFTWARE,
+# EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import ctypes
+
+__all__ = (
+    "transpose_matrix",
+    "zup_to_yup_matrix",
+    "yup_to_zup_matrix",
+    "flip_vertical",
+)
+
+
+# Matrices are handled as flat sequences of 16 floats, in the same
+# row-major order used by virtucamera.VCBase. All the work is done
+# with slicing, so no Python level loop runs over the 16 values.
+
+def transpose_matrix(matrix):
+    """ Return the transpose of a 4x4 matrix. Usefull to convert matrixes
+    with the translation in the last column, like the ones used by
+    Blender, to the order expected by VirtuCamera and vice versa.
+
+    Parameters
+    ----------
+    matrix : sequence of 16 floats
+        4x4 matrix in row-major order.
+
+    Returns
+    -------
+    tuple of 16 floats
+        transposed matrix in row-major order.
+    """
+
+    m = tuple(matrix)
+    return m[0::4] + m[1::4] + m[2::4] + m[3::4]
+
+
+def zup_to_yup_matrix(matrix):
+    """ Return a 4x4 transform matrix from a Z+ up scene converted
+    to the Y+ up axis expected by VirtuCamera, as
+    (x, y, z) -> (x, z, -y) applied to every row of the matrix.
+
+    Parameters
+    ----------
+    matrix : sequence of 16 floats
+        4x4 transform matrix with the up axis being Z+, with the
+        order described in virtucamera.VCBase.get_camera_transform().
+
+    Returns
+    -------
+    tuple of 16 floats
+        4x4 transform matrix with the up axis being Y+.
+    """
+
+    m = tuple(matrix)
+    result = list(m)
+    result[1::4] = m[2::4]
+    result[2::4] = [-value for value in m[1::4]]
+    return tuple(result)
+
+
+def yup_to_zup_matrix(matrix):
+    """ Return a 4x4 transform matrix from VirtuCamera, with the up axis
+    being Y+, converted to a Z+ up scene, as (x, y, z) -> (x, -z, y)
+    applied to every row of the matrix. Inverse of zup_to_yup_matrix().
+
+    Parameters
+    ----------
+    matrix : sequence of 16 floats
+        4x4 transform matrix with the up axis being Y+, with the
+        order described in virtucamera.VCBase.set_camera_transform().
+
+    Returns
+    -------
+    tuple of 16 floats
+        4x4 transform matrix with the up axis being Z+.
+    """
+
+    m = tuple(matrix)
+    result = list(m)
+    result[1::4] = [-value for value in m[2::4]]
+    result[2::4] = m[1::4]
+    return tuple(result)
+
+
+def flip_vertical(src_ptr, dst_ptr, stride, height):
+    """ Copy an image from 'src_ptr' to 'dst_ptr' flipping it vertically.
+    If 'src_ptr' and 'dst_ptr' are the same address, the image is
+    flipped in place. Otherwise the source and destination images
+    must not overlap, or ValueError is raised.
+
+    This is a Python loop calling ctypes.memmove() once per row, or three
+    times per row when flipping in place, so it's slow for big images.
+    If the only purpose is to send the image flipped, call
+    vcserver.set_vertical_flip() instead of using this.
+
+    Parameters
+    ----------
+    src_ptr : int
+        Memory address of the first row of the source image.
+    dst_ptr : int
+        Memory address of the first row of the destination image,
+        with room for 'stride' * 'height' bytes.
+    stride : int
+        Size of a row in bytes.
+    height : int
+        Number of rows.
+    """
+
+    size = height * stride
+    if src_ptr != dst_ptr and src_ptr < dst_ptr + size and dst_ptr < src_ptr + size:
+        raise ValueError("Source and destination images overlap")
+    last_row = (height - 1) * stride
+    if src_ptr == dst_ptr:
+        row = ctypes.create_string_buffer(stride)
+        for offset in range(0, (height // 2) * stride, stride):
+            top = src_ptr + offset
+            bottom = src_ptr + last_row - offset
+            ctypes.memmove(row, top, stride)
+            ctypes.memmove(top, bottom, stride)
+            ctypes.memmove(bottom, row, stride)
+    else:
+        for offset in range(0, size, stride):
+            ctypes.memmove(dst_ptr + offset, src_ptr + last_row - offset, stride)